@@ -2,10 +2,23 @@
 增强版配置 - 基于北京真实数据
 """
 from dataclasses import dataclass, field
+from enum import IntEnum
 from typing import Dict, List, Tuple
 import yaml
 
 
+class AcquisitionChannel(IntEnum):
+    """获客渠道编号 - 与 BeijingRealDataConfig.acquisition_channels 列表下标一一对应"""
+    DIDI_APP = 0          # 滴滴App推荐
+    HOSPITAL_STATION = 1  # 医院驻点推广
+    COMMUNITY = 2         # 社区推广
+    WORD_OF_MOUTH = 3     # 口碑传播
+
+
+# 各渠道编号对应的渠道名称（按编号顺序），用于校验 acquisition_channels 的顺序
+ACQUISITION_CHANNEL_NAMES: Tuple[str, ...] = ("滴滴App推荐", "医院驻点推广", "社区推广", "口碑传播")
+
+
 @dataclass
 class BeijingRealDataConfig:
     """基于北京真实数据的增强配置"""
@@ -147,6 +160,14 @@ class BeijingRealDataConfig:
         "target_hospitals": ["协和医院", "301医院", "北医三院"],  # 重点医院
     })
 
+    def __post_init__(self):
+        # 订单按 AcquisitionChannel 编号下标取渠道，列表顺序变化会把订单记到错误渠道
+        channel_names = tuple(c["name"] for c in self.acquisition_channels)
+        assert channel_names == ACQUISITION_CHANNEL_NAMES, (
+            f"acquisition_channels 顺序须与 AcquisitionChannel 编号一致: "
+            f"期望 {ACQUISITION_CHANNEL_NAMES}，实际 {channel_names}"
+        )
+
     def to_yaml(self, file_path: str):
         """保存配置到 YAML 文件"""
         with open(file_path, 'w', encoding='utf-8') as f:
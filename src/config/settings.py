@@ -2,7 +2,7 @@
 配置模块 - 定义所有模拟参数
 """
 from dataclasses import dataclass, field
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional
 import yaml
 
 
@@ -110,12 +110,14 @@ class SimulationConfig:
     llm_model: str = "claude-sonnet-4-5-20250929"
     llm_api_key: str = ""  # 从环境变量读取
     llm_event_probability: float = 0.10  # 每日触发 LLM 事件的概率
+    llm_cache_path: Optional[str] = None  # LLM 响应缓存文件（shelve），为空则仅内存缓存
 
     # ========== 招募参数 ==========
     recruit_decay_factor: float = 0.3  # 招募难度递增系数
 
     # ========== 其他参数 ==========
     random_seed: int = 42  # 随机种子
+    metrics_parquet_path: Optional[str] = None  # 逐日指标 Parquet 输出路径（需要 pyarrow），为空则不写出
     enable_llm: bool = True  # 是否启用 LLM 功能
 
     @classmethod
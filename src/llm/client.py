@@ -3,13 +3,31 @@ LLM 客户端 - 支持 OpenAI 和 Anthropic
 """
 import os
 import time
+import json
+import shelve
+import hashlib
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, Dict
 from enum import Enum
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
 
+def _dumps_sorted(obj: Dict) -> bytes:
+    """按键排序序列化为 JSON 字节串（优先使用 orjson，未安装时回退标准库 json）"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
 class LLMProvider(Enum):
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
@@ -23,6 +41,9 @@ class LLMClient:
         self.model = model
         self.api_key = self._get_api_key()
 
+        # 后台请求线程池（首次异步调用时创建），避免网络 IO 阻塞模拟主循环
+        self._executor: Optional[ThreadPoolExecutor] = None
+
         # 初始化客户端
         if self.provider == LLMProvider.OPENAI:
             try:
@@ -49,10 +70,15 @@ class LLMClient:
                 raise ValueError("请设置环境变量 ANTHROPIC_API_KEY")
         return key
 
-    def generate(self, prompt: str, max_tokens: int = 2000, timeout: float = 30.0) -> str:
-        """生成文本 - 带指数退避重试（最多3次，间隔1s/2s/4s）"""
+    def generate(self, prompt: str, max_tokens: int = 2000, timeout: float = 30.0,
+                 temperature: Optional[float] = None) -> str:
+        """生成文本 - 带指数退避重试（最多3次，间隔1s/2s/4s）
+
+        temperature 为 None 时使用 API 默认值
+        """
         max_retries = 3
         base_delay = 1.0
+        extra = {} if temperature is None else {"temperature": temperature}
 
         for attempt in range(1, max_retries + 1):
             try:
@@ -62,6 +88,7 @@ class LLMClient:
                         messages=[{"role": "user", "content": prompt}],
                         max_tokens=max_tokens,
                         timeout=timeout,
+                        **extra,
                     )
                     return response.choices[0].message.content or ""
 
@@ -71,6 +98,7 @@ class LLMClient:
                         max_tokens=max_tokens,
                         messages=[{"role": "user", "content": prompt}],
                         timeout=timeout,
+                        **extra,
                     )
                     return response.content[0].text  # type: ignore[union-attr]
 
@@ -88,6 +116,22 @@ class LLMClient:
 
         return ""
 
+    def _submit(self, fn, *args) -> Future:
+        """将请求提交到后台线程池，立即返回 Future"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm")
+        return self._executor.submit(fn, *args)
+
+    def shutdown(self):
+        """等待后台请求及其完成回调全部执行完毕，并关闭线程池（之后的异步调用会重新创建）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def generate_event_async(self, state: Dict) -> Future:
+        """异步生成突发事件 - 返回 Future，结果同 generate_event"""
+        return self._submit(self.generate_event, state)
+
     def generate_event(self, state: Dict) -> Optional[Dict]:
         """生成突发事件"""
         prompt = f"""
@@ -123,6 +167,10 @@ class LLMClient:
 """
         return self.generate(prompt, max_tokens=200)
 
+    def generate_analysis_report_async(self, result: Dict) -> Future:
+        """异步生成分析报告 - 返回 Future，结果同 generate_analysis_report"""
+        return self._submit(self.generate_analysis_report, result)
+
     def generate_analysis_report(self, result: Dict) -> str:
         """生成分析报告"""
         prompt = f"""
@@ -150,4 +198,78 @@ class LLMClient:
 
 请生成报告：
 """
-        return self.generate(prompt, max_tokens=2000)
+        # 分析报告按数据确定性生成（temperature=0），可被 CachingLLMClient 复用
+        return self.generate(prompt, max_tokens=2000, temperature=0)
+
+    def close(self):
+        """关闭后台线程池"""
+        self.shutdown()
+
+
+class CachingLLMClient(LLMClient):
+    """带精确匹配响应缓存的 LLM 客户端
+
+    以 (provider, model, prompt, max_tokens, temperature) 的 sha256 为键缓存
+    响应，重复的模拟运行命中缓存时不再请求 API。指定 cache_path 时使用
+    shelve 落盘，可跨进程/跨运行复用；否则仅缓存在内存中。只缓存
+    temperature=0 的调用，按默认温度采样的创造性生成（如突发事件）每次都请求 API。
+    """
+
+    def __init__(self, provider: str = "anthropic", model: str = "claude-sonnet-4-5-20250929",
+                 cache_path: Optional[str] = None):
+        super().__init__(provider=provider, model=model)
+        self._cache_path = cache_path
+        # 落盘缓存在首次读写时打开，close() 后再次使用会重新打开（与线程池一致）
+        self._cache = None if cache_path else {}
+        # 异步请求在线程池中执行，shelve 非线程安全，读写需加锁
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_key(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        payload = _dumps_sorted(
+            {"provider": self.provider.value, "model": self.model,
+             "prompt": prompt, "max_tokens": max_tokens, "temperature": temperature}
+        )
+        return hashlib.sha256(payload).hexdigest()
+
+    def _open_cache(self):
+        """返回缓存映射，落盘缓存已关闭时重新打开（调用方需持有 _cache_lock）"""
+        if self._cache is None:
+            self._cache = shelve.open(self._cache_path)
+        return self._cache
+
+    def generate(self, prompt: str, max_tokens: int = 2000, timeout: float = 30.0,
+                 temperature: Optional[float] = None) -> str:
+        """生成文本 - 命中缓存直接返回，否则调用 API 并写入缓存（非 temperature=0 的调用不走缓存）"""
+        if temperature != 0:
+            return super().generate(prompt, max_tokens=max_tokens, timeout=timeout,
+                                    temperature=temperature)
+
+        key = self._cache_key(prompt, max_tokens, temperature)
+        with self._cache_lock:
+            cached = self._open_cache().get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        response = super().generate(prompt, max_tokens=max_tokens, timeout=timeout,
+                                    temperature=temperature)
+        # 失败返回的空串不缓存，下次仍会重试
+        if response:
+            with self._cache_lock:
+                self._open_cache()[key] = response
+        return response
+
+    def cache_stats(self) -> Dict[str, int]:
+        """缓存命中统计"""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        """等待后台请求结束并关闭落盘缓存（之后再调用 generate 会重新打开）"""
+        super().close()
+        with self._cache_lock:
+            if isinstance(self._cache, shelve.Shelf):
+                self._cache.close()
+                self._cache = None
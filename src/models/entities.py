@@ -27,7 +27,7 @@ class OrderStatus(Enum):
     FAILED = "失败"
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     """用户模型"""
     id: str = field(default_factory=lambda: str(uuid4()))
@@ -89,7 +89,7 @@ class User:
         return f"User({self.id[:8]}, {self.disease_type}, {self.target_hospital})"
 
 
-@dataclass
+@dataclass(slots=True)
 class Escort:
     """陪诊员模型"""
     id: str = field(default_factory=lambda: str(uuid4()))
@@ -162,7 +162,7 @@ class Escort:
         self.churn_risk = (income_factor + order_factor) / 2
 
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     """订单模型"""
     id: str = field(default_factory=lambda: str(uuid4()))
@@ -185,6 +185,7 @@ class Order:
 
     # 获客渠道信息（增强版需求生成器使用）
     acquisition_channel: Optional[str] = None
+    acquisition_channel_id: int = -1  # AcquisitionChannel 编号，-1 表示无渠道（复购）
     acquisition_cost: float = 0.0
 
     # 时段信息
@@ -1,8 +1,8 @@
 """
 数据统计与分析模块
 """
-from typing import Dict, List
-from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field, fields
 import pandas as pd
 import numpy as np
 
@@ -56,6 +56,19 @@ class DailyMetrics:
     cac_per_order: float = 0.0  # 单均获客成本
 
 
+def _metrics_to_arrays(metrics: List[DailyMetrics]) -> Dict[str, np.ndarray]:
+    """将逐日指标按列转换为 NumPy 数组"""
+    n = len(metrics)
+    return {
+        f.name: np.fromiter(
+            (getattr(m, f.name) for m in metrics),
+            dtype=np.int64 if f.type is int else np.float64,
+            count=n,
+        )
+        for f in fields(DailyMetrics)
+    }
+
+
 @dataclass
 class SimulationResult:
     """模拟结果"""
@@ -96,12 +109,13 @@ class SimulationResult:
     # LLM 生成的报告
     llm_report: str = ""
 
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """按列转换为 NumPy 数组 {指标名: 逐日数组}（计数为 int64，金额/比率为 float64）"""
+        return _metrics_to_arrays(self.daily_metrics)
+
     def to_dataframe(self) -> pd.DataFrame:
-        """转换为 DataFrame"""
-        data = []
-        for metric in self.daily_metrics:
-            data.append(metric.__dict__)
-        return pd.DataFrame(data)
+        """转换为 DataFrame（直接包装列数组，不再逐行构造）"""
+        return pd.DataFrame(self.to_arrays(), copy=False)
 
     def calculate_summary(self):
         """计算汇总指标"""
@@ -182,9 +196,26 @@ class SimulationResult:
 class Analytics:
     """数据分析器"""
 
-    def __init__(self):
+    def __init__(self, parquet_path: Optional[str] = None, flush_rows: int = 256):
         self.daily_metrics: List[DailyMetrics] = []
 
+        # 可选：逐日指标按批追加写入 Parquet（需要 pyarrow），供长周期模拟离线分析
+        self.parquet_path = parquet_path
+        self.flush_rows = flush_rows
+        self._pending_rows: List[DailyMetrics] = []
+        self._parquet_writer = None
+        # close() 之后不能再追加：重新打开 ParquetWriter 会覆盖已写出的文件
+        self._parquet_closed = False
+        if parquet_path:
+            # 构造时即检查 pyarrow，避免整轮模拟跑完后才在写出时报错
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("请安装 pyarrow: pip install pyarrow")
+            self._pa = pa
+            self._pq = pq
+
     def record_daily(
         self,
         day: int,
@@ -304,8 +335,37 @@ class Analytics:
 
         self.daily_metrics.append(metric)
 
+        if self.parquet_path:
+            if self._parquet_closed:
+                raise RuntimeError(f"Parquet 文件已关闭，不能继续追加逐日指标: {self.parquet_path}")
+            self._pending_rows.append(metric)
+            if len(self._pending_rows) >= self.flush_rows:
+                self._flush_parquet()
+
+    def _flush_parquet(self):
+        """将缓冲的逐日指标作为一个行组追加写入 Parquet 文件"""
+        if not self._pending_rows:
+            return
+
+        table = self._pa.Table.from_pydict(_metrics_to_arrays(self._pending_rows))
+        if self._parquet_writer is None:
+            self._parquet_writer = self._pq.ParquetWriter(self.parquet_path, table.schema)
+        self._parquet_writer.write_table(table)
+        self._pending_rows = []
+
+    def close(self):
+        """写出剩余指标并关闭 Parquet 文件（可重复调用）"""
+        if not self.parquet_path or self._parquet_closed:
+            return
+        self._flush_parquet()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        self._parquet_closed = True
+
     def generate_report(self, config) -> SimulationResult:
         """生成模拟报告"""
+        self.close()
         result = SimulationResult(
             config=config.__dict__,
             daily_metrics=self.daily_metrics,
@@ -95,6 +95,8 @@ class ComplaintHandler:
         self.total_complaints: int = 0
         self.resolved_complaints: int = 0
         self.repurchased_after_complaint: int = 0
+        # 待处理（PENDING/IN_PROGRESS）投诉数，随状态流转增量维护
+        self.pending_complaints: int = 0
 
         self.current_complaint_rate: float = 0.0
         self.conversion_rate_modifier: float = 1.0
@@ -144,6 +146,7 @@ class ComplaintHandler:
 
         self.complaints.append(complaint)
         self.total_complaints += 1
+        self.pending_complaints += 1
         self.complaints_by_type[complaint_type.value] += 1
 
         return complaint
@@ -176,6 +179,7 @@ class ComplaintHandler:
                         complaint.resolved_day = current_day
                         complaint.resolution_hours = days_since_created * 24
                         self.resolved_complaints += 1
+                        self.pending_complaints -= 1
 
                         # 50%概率投诉后仍然复购（复购救回率）
                         if random.random() < 0.50:
@@ -183,6 +187,7 @@ class ComplaintHandler:
                             self.repurchased_after_complaint += 1
                     else:
                         complaint.status = ComplaintStatus.ESCALATED
+                        self.pending_complaints -= 1
 
         # 更新投诉率和转化率修正系数
         self._update_complaint_rate(total_orders)
@@ -235,10 +240,7 @@ class ComplaintHandler:
         return {
             "total_complaints": self.total_complaints,
             "resolved_complaints": self.resolved_complaints,
-            "pending_complaints": sum(
-                1 for c in self.complaints
-                if c.status in (ComplaintStatus.PENDING, ComplaintStatus.IN_PROGRESS)
-            ),
+            "pending_complaints": self.pending_complaints,
             "resolution_rate": resolution_rate,
             "repurchase_recovery_rate": repurchase_recovery_rate,
             "current_complaint_rate": self.current_complaint_rate,
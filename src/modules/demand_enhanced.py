@@ -13,7 +13,7 @@ from typing import List, Dict, Optional
 import numpy as np
 
 from ..config.settings import SimulationConfig
-from ..config.beijing_real_data import BeijingRealDataConfig
+from ..config.beijing_real_data import AcquisitionChannel, BeijingRealDataConfig
 from ..models.entities import User, Order, OrderStatus
 
 
@@ -44,13 +44,17 @@ def _generate_user_age() -> int:
 class EnhancedDemandGenerator:
     """增强版需求生成器 - 考虑真实数据"""
 
-    def __init__(self, config: SimulationConfig, beijing_data: BeijingRealDataConfig):
+    def __init__(self, config: SimulationConfig, beijing_data: BeijingRealDataConfig,
+                 rng: Optional[random.Random] = None):
         self.config = config
         self.beijing_data = beijing_data
         self.repurchase_pool: Dict[str, User] = {}
         self.conversion_rate_modifier: float = 1.0  # 投诉率影响的转化率修正系数
 
-        random.seed(config.random_seed)
+        # 随机数发生器：未传入时沿用按 random_seed 播种的全局 random 模块
+        if rng is None:
+            random.seed(config.random_seed)
+        self.rng = rng or random
         np.random.seed(config.random_seed)
 
         # 预计算医院权重（基于门诊量）
@@ -108,19 +112,19 @@ class EnhancedDemandGenerator:
 
         # 1. 滴滴 App 推荐渠道
         app_orders = self._generate_channel_orders(
-            self.beijing_data.acquisition_channels[0], day
+            AcquisitionChannel.DIDI_APP, day
         )
         all_orders.extend(app_orders)
 
         # 2. 医院驻点推广渠道
         station_orders = self._generate_station_orders(
-            self.beijing_data.acquisition_channels[1], day
+            AcquisitionChannel.HOSPITAL_STATION, day
         )
         all_orders.extend(station_orders)
 
         # 3. 社区推广渠道
         community_orders = self._generate_community_orders(
-            self.beijing_data.acquisition_channels[2], day
+            AcquisitionChannel.COMMUNITY, day
         )
         all_orders.extend(community_orders)
 
@@ -144,11 +148,11 @@ class EnhancedDemandGenerator:
         if time_factor != 1.0:
             target_count = max(0, int(len(all_orders) * time_factor))
             if target_count < len(all_orders):
-                all_orders = random.sample(all_orders, target_count)
+                all_orders = self.rng.sample(all_orders, target_count)
             elif target_count > len(all_orders) and all_orders:
                 extra = target_count - len(all_orders)
                 for _ in range(extra):
-                    template = random.choice(all_orders)
+                    template = self.rng.choice(all_orders)
                     new_order = Order(
                         user=template.user,
                         price=template.price,
@@ -171,18 +175,19 @@ class EnhancedDemandGenerator:
 
         for order in orders:
             # 随机分配一个工作时间内的小时
-            hour = random.randint(work_start, work_end - 1)
+            hour = self.rng.randint(work_start, work_end - 1)
             order.hour_of_day = hour
 
             # 根据时段系数决定是否保留该订单
             factor = self._get_hourly_factor(hour)
-            if random.random() < factor / 1.8:  # 归一化到最大系数
+            if self.rng.random() < factor / 1.8:  # 归一化到最大系数
                 adjusted_orders.append(order)
 
         return adjusted_orders
 
-    def _generate_channel_orders(self, channel: Dict, day: int) -> List[Order]:
+    def _generate_channel_orders(self, channel_id: AcquisitionChannel, day: int) -> List[Order]:
         """生成特定渠道的订单"""
+        channel = self.beijing_data.acquisition_channels[channel_id]
         # 计算该渠道的订单量
         exposure = channel["daily_exposure"]
         click_rate = channel["click_rate"]
@@ -197,16 +202,17 @@ class EnhancedDemandGenerator:
         orders = []
         for _ in range(order_count):
             user = self._create_user_with_real_data(channel_type=channel["type"])
-            order = self._create_order_with_real_pricing(user, day, channel)
+            order = self._create_order_with_real_pricing(user, day, channel_id)
             orders.append(order)
 
         return orders
 
-    def _generate_station_orders(self, channel: Dict, day: int) -> List[Order]:
+    def _generate_station_orders(self, channel_id: AcquisitionChannel, day: int) -> List[Order]:
         """生成医院驻点推广订单"""
         if not self.beijing_data.station_promotion["enabled"]:
             return []
 
+        channel = self.beijing_data.acquisition_channels[channel_id]
         orders = []
         target_hospitals = channel.get("hospitals", [])
 
@@ -224,13 +230,14 @@ class EnhancedDemandGenerator:
                     channel_type="offline",
                     preferred_hospital=hospital_name
                 )
-                order = self._create_order_with_real_pricing(user, day, channel)
+                order = self._create_order_with_real_pricing(user, day, channel_id)
                 orders.append(order)
 
         return orders
 
-    def _generate_community_orders(self, channel: Dict, day: int) -> List[Order]:
+    def _generate_community_orders(self, channel_id: AcquisitionChannel, day: int) -> List[Order]:
         """生成社区推广订单"""
+        channel = self.beijing_data.acquisition_channels[channel_id]
         target_districts = channel.get("target_districts", [])
 
         orders = []
@@ -248,7 +255,7 @@ class EnhancedDemandGenerator:
                     channel_type="offline",
                     district=district
                 )
-                order = self._create_order_with_real_pricing(user, day, channel)
+                order = self._create_order_with_real_pricing(user, day, channel_id)
                 orders.append(order)
 
         return orders
@@ -264,13 +271,14 @@ class EnhancedDemandGenerator:
         orders = []
         for user in high_rating_users:
             # 每个高评分用户有 5% 概率推荐新用户
-            if random.random() < 0.05:
+            if self.rng.random() < 0.05:
                 new_user = self._create_user_with_real_data(
                     channel_type="referral",
                     referrer=user
                 )
-                channel = self.beijing_data.acquisition_channels[3]
-                order = self._create_order_with_real_pricing(new_user, day, channel)
+                order = self._create_order_with_real_pricing(
+                    new_user, day, AcquisitionChannel.WORD_OF_MOUTH
+                )
                 orders.append(order)
 
         return orders
@@ -284,7 +292,7 @@ class EnhancedDemandGenerator:
                 # 根据用户收入等级决定复购概率
                 repurchase_prob = self._get_repurchase_prob_by_income(user)
 
-                if random.random() < repurchase_prob:
+                if self.rng.random() < repurchase_prob:
                     user.is_repurchase = True
                     user.total_orders += 1
                     order = self._create_order_with_real_pricing(user, day, None)
@@ -307,7 +315,7 @@ class EnhancedDemandGenerator:
         behavior = AGE_BEHAVIOR[age_group]
 
         # 2. 根据年龄分层确定子女代购率
-        is_children_purchase = random.random() < behavior["children_purchase_rate"]
+        is_children_purchase = self.rng.random() < behavior["children_purchase_rate"]
 
         # 3. 选择医院（基于权重）
         if preferred_hospital:
@@ -315,12 +323,12 @@ class EnhancedDemandGenerator:
         else:
             hospitals = list(self.hospital_weights.keys())
             weights = list(self.hospital_weights.values())
-            target_hospital = random.choices(hospitals, weights=weights)[0]
+            target_hospital = self.rng.choices(hospitals, weights=weights)[0]
 
         # 4. 选择疾病（基于真实分布）
         diseases = list(self.beijing_data.disease_distribution.keys())
         weights = list(self.beijing_data.disease_distribution.values())
-        disease_type = random.choices(diseases, weights=weights)[0]
+        disease_type = self.rng.choices(diseases, weights=weights)[0]
 
         # 5. 选择区域（影响付费能力）
         if district:
@@ -328,7 +336,7 @@ class EnhancedDemandGenerator:
         else:
             districts = list(self.district_weights.keys())
             weights = list(self.district_weights.values())
-            user_district = random.choices(districts, weights=weights)[0]
+            user_district = self.rng.choices(districts, weights=weights)[0]
 
         # 6. 确定收入等级
         income_levels = list(self.beijing_data.elderly_income_distribution.keys())
@@ -336,13 +344,13 @@ class EnhancedDemandGenerator:
             data["ratio"]
             for data in self.beijing_data.elderly_income_distribution.values()
         ]
-        income_level = random.choices(income_levels, weights=income_ratios)[0]
+        income_level = self.rng.choices(income_levels, weights=income_ratios)[0]
 
         # 7. 创建用户（使用年龄分层后的配置）
         user = User(
             target_hospital=target_hospital,
             disease_type=disease_type,
-            service_period=random.choice(["上午", "下午", "全天"]),
+            service_period=self.rng.choice(["上午", "下午", "全天"]),
             price_sensitivity=behavior["price_sensitivity"],
             is_repurchase=False,
             total_orders=1,
@@ -360,9 +368,12 @@ class EnhancedDemandGenerator:
         self,
         user: User,
         day: int,
-        channel: Optional[Dict] = None
+        channel_id: Optional[AcquisitionChannel] = None
     ) -> Order:
         """创建订单 - 基于真实定价（动态定价）"""
+        channel = (
+            self.beijing_data.acquisition_channels[channel_id] if channel_id is not None else None
+        )
 
         # 1. 基础价格（根据医院等级）
         hospital_tier = self._get_hospital_tier(user.target_hospital)
@@ -405,6 +416,7 @@ class EnhancedDemandGenerator:
             order.cancel_reason = "价格超预算"
             if channel:
                 order.acquisition_channel = channel["name"]
+                order.acquisition_channel_id = channel_id
                 order.acquisition_cost = channel.get("cost_per_order", 0)
             return order
 
@@ -417,6 +429,7 @@ class EnhancedDemandGenerator:
         # 存储渠道信息
         if channel:
             order.acquisition_channel = channel["name"]
+            order.acquisition_channel_id = channel_id
             order.acquisition_cost = channel.get("cost_per_order", 0)
 
         return order
@@ -508,7 +521,7 @@ class EnhancedDemandGenerator:
             for _ in range(additional):
                 # 复制一个随机订单
                 if orders:
-                    template = random.choice(orders)
+                    template = self.rng.choice(orders)
                     new_order = Order(
                         user=template.user,
                         price=template.price,
@@ -518,7 +531,7 @@ class EnhancedDemandGenerator:
         elif factor < 1.0:
             # 减少订单
             keep_count = int(len(orders) * factor)
-            orders = random.sample(orders, keep_count)
+            orders = self.rng.sample(orders, keep_count)
 
         return orders
 
@@ -2,10 +2,12 @@
 业务事件生成器 - 为报告添加具体事件描述
 """
 import random
-from typing import List, Dict
-import pandas as pd
+from typing import List, Dict, Optional, TYPE_CHECKING
 from dataclasses import dataclass
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 # 政策风险事件定义
 POLICY_RISK_EVENTS = [
@@ -60,7 +62,8 @@ class BusinessEvent:
 class EventGenerator:
     """事件生成器"""
 
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: Optional["pd.DataFrame"] = None):
+        # 历史日数据（仅周报事件使用；只需政策风险事件时可不传）
         self.df = df
         self.active_policy_events: List[Dict] = []  # 当前生效的政策事件
 
@@ -119,6 +122,8 @@ class EventGenerator:
     def generate_weekly_events(self, start_day: int, end_day: int) -> List[BusinessEvent]:
         """生成一周内的关键事件"""
         events = []
+        if self.df is None:
+            return events
         week_data = self.df.iloc[start_day:end_day + 1]
 
         # 1. 服务质量事件
@@ -141,7 +146,7 @@ class EventGenerator:
         events.sort(key=lambda e: self._calculate_importance(e), reverse=True)
         return events[:5]
 
-    def _generate_service_events(self, week_data: pd.DataFrame, start_day: int) -> List[BusinessEvent]:
+    def _generate_service_events(self, week_data: "pd.DataFrame", start_day: int) -> List[BusinessEvent]:
         """生成服务相关事件"""
         events = []
 
@@ -209,7 +214,7 @@ class EventGenerator:
 
         return events
 
-    def _generate_market_events(self, week_data: pd.DataFrame, start_day: int) -> List[BusinessEvent]:
+    def _generate_market_events(self, week_data: "pd.DataFrame", start_day: int) -> List[BusinessEvent]:
         """生成市场相关事件"""
         events = []
 
@@ -263,7 +268,7 @@ class EventGenerator:
 
         return events
 
-    def _generate_operation_events(self, week_data: pd.DataFrame, start_day: int) -> List[BusinessEvent]:
+    def _generate_operation_events(self, week_data: "pd.DataFrame", start_day: int) -> List[BusinessEvent]:
         """生成运营相关事件"""
         events = []
 
@@ -327,7 +332,7 @@ class EventGenerator:
 
         return events
 
-    def _generate_user_events(self, week_data: pd.DataFrame, start_day: int) -> List[BusinessEvent]:
+    def _generate_user_events(self, week_data: "pd.DataFrame", start_day: int) -> List[BusinessEvent]:
         """生成用户相关事件"""
         events = []
 
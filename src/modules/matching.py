@@ -6,12 +6,13 @@
 匹配与履约模块 - 订单分配与服务完成
 """
 import random
-from typing import List, Optional, Dict, TYPE_CHECKING
+from collections import deque
+from typing import Deque, List, Optional, Dict, Tuple, TYPE_CHECKING
 from datetime import datetime, timedelta
 import numpy as np
 
 from ..config.settings import SimulationConfig
-from ..models.entities import Order, Escort, OrderStatus, EscortStatus
+from ..models.entities import Order, Escort, User, OrderStatus, EscortStatus
 
 if TYPE_CHECKING:
     from .complaint_handler import ComplaintHandler
@@ -43,9 +44,19 @@ class MatchingEngine:
         self.geo_matcher = geo_matcher              # 地理位置匹配器（可选）
         self.waiting_queue: List[Order] = []
         self.serving_orders: List[Order] = []
-        self.completed_orders: List[Order] = []
-        self.failed_orders: List[Order] = []
-        self._max_completed_records = 3000  # 内存保护：只保留最近3000条（约30天x100单/天）
+        self._max_completed_records = 3000  # 内存保护：完成/失败订单列表只保留最近3000条（约30天x100单/天）
+        # 定长环形缓冲：超出上限时自动丢弃最旧记录，无需整表切片复制
+        self.completed_orders: Deque[Order] = deque(maxlen=self._max_completed_records)
+        self.failed_orders: Deque[Order] = deque(maxlen=self._max_completed_records)
+        # 当日完成/失败订单（reset_daily_count 时换新列表）
+        self.daily_completed: List[Order] = []
+        self.daily_failed: List[Order] = []
+        # 累计失败订单数（failed_orders 列表有上限，总数单独计数）
+        self.total_failed_count: int = 0
+        # 最近完成订单的 (用户, 评分)，供负面口碑传播按固定窗口回看
+        self.recent_completed: Deque[Tuple[User, float]] = deque(maxlen=50)
+        # get_statistics 结果缓存（订单状态只在 process_orders 中变化，届时失效）
+        self._stats_cache: Optional[Dict] = None
 
         # 陪诊员当日接单计数
         self.daily_order_count: Dict[str, int] = {}
@@ -64,6 +75,8 @@ class MatchingEngine:
 
     def process_orders(self, new_orders: List[Order], available_escorts: List[Escort], day: int):
         """处理订单匹配与履约"""
+        self._stats_cache = None
+
         # 1. 将新订单加入等待队列
         self.waiting_queue.extend(new_orders)
 
@@ -129,7 +142,7 @@ class MatchingEngine:
             if order in self.waiting_queue:
                 self.waiting_queue.remove(order)
             order.status = OrderStatus.FAILED
-            self.failed_orders.append(order)
+            self._record_failed(order)
 
     def _find_best_escort(self, order: Order, available_escorts: List[Escort]) -> Optional[Escort]:
         """
@@ -317,9 +330,8 @@ class MatchingEngine:
                     order.user.lifecycle_state = "active"
 
                 self.completed_orders.append(order)
-                # 内存保护：截断超出上限的旧记录
-                if len(self.completed_orders) > self._max_completed_records:
-                    self.completed_orders = self.completed_orders[-self._max_completed_records:]
+                self.daily_completed.append(order)
+                self.recent_completed.append((order.user, order.rating))
             else:
                 # 服务失败
                 order.status = OrderStatus.FAILED
@@ -340,7 +352,7 @@ class MatchingEngine:
                         day=day,
                     )
 
-                self.failed_orders.append(order)
+                self._record_failed(order)
 
             completed.append(order)
 
@@ -367,25 +379,40 @@ class MatchingEngine:
                     day=day,
                 )
 
-            self.failed_orders.append(order)
+            self._record_failed(order)
 
         self.waiting_queue.clear()
 
+    def _record_failed(self, order: Order):
+        """记录失败订单"""
+        self.failed_orders.append(order)
+        self.daily_failed.append(order)
+        self.total_failed_count += 1
+
     def reset_daily_count(self):
         """重置每日接单计数"""
         self.daily_order_count.clear()
+        self.daily_completed = []
+        self.daily_failed = []
 
     def get_statistics(self) -> Dict:
-        """获取履约统计数据"""
+        """获取履约统计数据（同一天内多次调用复用缓存结果）"""
+        if self._stats_cache is None:
+            self._stats_cache = self._compute_statistics()
+        # 返回副本：调用方会在结果上追加字段（如 completed_orders_list）
+        return dict(self._stats_cache)
+
+    def _compute_statistics(self) -> Dict:
+        """计算履约统计数据"""
         total_orders = (
             len(self.completed_orders) +
-            len(self.failed_orders) +
+            self.total_failed_count +
             len(self.serving_orders) +
             len(self.waiting_queue)
         )
 
         completed_count = len(self.completed_orders)
-        failed_count = len(self.failed_orders)
+        failed_count = self.total_failed_count
         completion_rate = completed_count / total_orders if total_orders > 0 else 0
 
         avg_rating = np.mean([o.rating for o in self.completed_orders if o.rating]) \
@@ -8,35 +8,104 @@
 增强版匹配引擎 - 支持地理距离和时间约束
 """
 import random
-from typing import List, Optional, Dict, Tuple, TYPE_CHECKING
+from collections import deque
+from typing import Deque, List, Optional, Dict, Tuple, TYPE_CHECKING
 from datetime import datetime, timedelta
 import numpy as np
-import math
 
 from ..config.settings import SimulationConfig
 from ..config.beijing_real_data import BeijingRealDataConfig
-from ..models.entities import Order, Escort, OrderStatus, EscortStatus
+from ..models.entities import Order, Escort, User, OrderStatus, EscortStatus
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """未安装 numba 时的空装饰器，评分核函数按 numpy 向量化代码执行"""
+        def decorator(func):
+            return func
+        return decorator
 
 if TYPE_CHECKING:
     from .complaint_handler import ComplaintHandler
     from .geo_matcher import GeoMatcher
 
 
+@njit(cache=True)
+def _haversine_km(lat1: np.ndarray, lon1: np.ndarray, lat2: float, lon2: float) -> np.ndarray:
+    """计算各陪诊员到医院的距离（公里）- 使用 Haversine 公式，按数组批量计算"""
+    R = 6371  # 地球半径（公里）
+
+    lat1_rad = np.radians(lat1)
+    lat2_rad = np.radians(lat2)
+    delta_lat = np.radians(lat2 - lat1)
+    delta_lon = np.radians(lon2 - lon1)
+
+    a = (np.sin(delta_lat / 2) ** 2 +
+         np.cos(lat1_rad) * np.cos(lat2_rad) *
+         np.sin(delta_lon / 2) ** 2)
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return R * c
+
+
+@njit(cache=True)
+def _commute_minutes(distance: np.ndarray) -> np.ndarray:
+    """估算通勤时间（分钟）"""
+    # 假设平均速度：
+    # - 0-5公里：地铁/公交，20公里/小时
+    # - 5-15公里：地铁，30公里/小时
+    # - 15+公里：地铁+换乘，25公里/小时
+    speed = np.where(distance <= 5, 20.0, np.where(distance <= 15, 30.0, 25.0))
+    return distance / speed * 60
+
+
+@njit(cache=True)
+def score_matches(escort_lat: np.ndarray, escort_lon: np.ndarray, rating_score: np.ndarray,
+                  specialized: np.ndarray, hospital_lat: float, hospital_lon: float):
+    """匹配评分核函数：返回通勤 90 分钟内的陪诊员下标及其匹配分数
+
+    纯数组输入（numba 可用时 JIT 编译）：
+    - 距离分数：距离越近分数越高，最高50分
+    - 评分分数：rating_score = 评分 * 6，最高30分
+    - 专业度分数：擅长该医院（specialized 为真）加20分
+    """
+    distance = _haversine_km(escort_lat, escort_lon, hospital_lat, hospital_lon)
+    idx = np.flatnonzero(_commute_minutes(distance) <= 90)
+    near = distance[idx]
+    scores = np.maximum(0, 50 - near * 2) + rating_score[idx] + 20 * specialized[idx]
+    return idx, scores
+
+
 class EnhancedMatchingEngine:
     """增强版匹配引擎 - 考虑地理距离和时间约束"""
 
     def __init__(self, config: SimulationConfig, beijing_data: BeijingRealDataConfig,
                  complaint_handler: Optional["ComplaintHandler"] = None,
-                 geo_matcher: Optional["GeoMatcher"] = None):
+                 geo_matcher: Optional["GeoMatcher"] = None,
+                 rng: Optional[random.Random] = None):
         self.config = config
         self.beijing_data = beijing_data
         self.complaint_handler = complaint_handler
         self.geo_matcher_external = geo_matcher
         self.waiting_queue: List[Order] = []
         self.serving_orders: List[Order] = []
-        self.completed_orders: List[Order] = []
-        self.failed_orders: List[Order] = []
-        self._max_completed_records = 3000  # 内存保护：只保留最近3000条
+        self._max_completed_records = 3000  # 内存保护：完成/失败订单列表只保留最近3000条
+        # 定长环形缓冲：超出上限时自动丢弃最旧记录，无需整表切片复制
+        self.completed_orders: Deque[Order] = deque(maxlen=self._max_completed_records)
+        self.failed_orders: Deque[Order] = deque(maxlen=self._max_completed_records)
+        # 当日完成/失败订单（reset_daily_count 时换新列表）
+        self.daily_completed: List[Order] = []
+        self.daily_failed: List[Order] = []
+        # 累计失败订单数（failed_orders 列表有上限，总数单独计数）
+        self.total_failed_count: int = 0
+        # 最近完成订单的 (用户, 评分)，供负面口碑传播按固定窗口回看
+        self.recent_completed: Deque[Tuple[User, float]] = deque(maxlen=50)
+        # get_statistics 结果缓存（订单状态只在 process_orders 中变化，届时失效）
+        self._stats_cache: Optional[Dict] = None
 
         # 陪诊员当日接单计数
         self.daily_order_count: Dict[str, int] = {}
@@ -48,7 +117,10 @@ class EnhancedMatchingEngine:
         # 医院位置缓存
         self.hospital_locations = self._build_hospital_location_cache()
 
-        random.seed(config.random_seed)
+        # 随机数发生器：未传入时沿用按 random_seed 播种的全局 random 模块
+        if rng is None:
+            random.seed(config.random_seed)
+        self.rng = rng or random
         np.random.seed(config.random_seed)
 
     def _build_hospital_location_cache(self) -> Dict[str, Dict]:
@@ -64,6 +136,8 @@ class EnhancedMatchingEngine:
 
     def process_orders(self, new_orders: List[Order], available_escorts: List[Escort], day: int):
         """处理订单匹配与履约"""
+        self._stats_cache = None
+
         # 1. 将新订单加入等待队列
         self.waiting_queue.extend(new_orders)
 
@@ -77,136 +151,113 @@ class EnhancedMatchingEngine:
         self._process_timeout_orders(day)
 
     def _match_orders_with_constraints(self, available_escorts: List[Escort], day: int):
-        """匹配订单与陪诊员 - 考虑地理距离和时间约束"""
-        matched_orders = []
-
-        for order in self.waiting_queue[:]:  # 使用切片避免修改迭代中的列表
-            # 查找可用的陪诊员（考虑地理距离和时间）
-            escort = self._find_best_escort_with_constraints(order, available_escorts, day)
-
-            if escort:
-                # 匹配成功
-                order.escort = escort
-                order.status = OrderStatus.MATCHED
-                order.matched_at = datetime.now() + timedelta(days=day)
-
-                # 开始服务
-                order.status = OrderStatus.SERVING
-                order.service_start_at = order.matched_at
-                escort.status = EscortStatus.SERVING
-                escort.current_order_id = order.id
-
-                # 生成服务时长
-                order.service_duration = max(0.5, np.random.normal(
-                    self.config.service_duration_mean,
-                    self.config.service_duration_std
-                ))
-
-                # 更新陪诊员时间表
-                if escort.id not in self.escort_schedule:
-                    self.escort_schedule[escort.id] = []
-                service_start_hour = self.config.work_hours[0]  # 使用工作时间窗口起始
-                service_end_hour = service_start_hour + order.service_duration
-                self.escort_schedule[escort.id].append((day, service_start_hour, service_end_hour))
-
-                # 更新陪诊员接单计数
-                self.daily_order_count[escort.id] = self.daily_order_count.get(escort.id, 0) + 1
-
-                # 移到服务中列表
-                self.serving_orders.append(order)
-                matched_orders.append(order)
-
-                # 如果达到日接单上限，从可用列表移除
-                if self.daily_order_count[escort.id] >= self.config.daily_order_limit:
-                    if escort in available_escorts:
-                        available_escorts.remove(escort)
-
-        # 从等待队列移除已匹配订单
-        for order in matched_orders:
-            if order in self.waiting_queue:
-                self.waiting_queue.remove(order)
-
-    def _find_best_escort_with_constraints(
-        self,
-        order: Order,
-        available_escorts: List[Escort],
-        day: int
-    ) -> Optional[Escort]:
-        """为订单找到最佳陪诊员 - 考虑地理距离和时间约束"""
-        if not available_escorts:
-            return None
-
-        # 获取医院位置
-        hospital_location = self.hospital_locations.get(order.user.target_hospital)
-        if not hospital_location:
-            return None
-
-        # 筛选符合条件的陪诊员
-        candidates = []
-        for escort in available_escorts:
-            # 1. 检查是否达到日接单上限
-            if self.daily_order_count.get(escort.id, 0) >= self.config.daily_order_limit:
-                continue
-
-            # 2. 检查地理距离（通勤时间不超过90分钟）
-            distance = self._calculate_distance(
-                escort.location_lat,
-                escort.location_lon,
-                hospital_location["lat"],
-                hospital_location["lon"]
-            )
-            commute_time = self._estimate_commute_time(distance)
-            if commute_time > 90:  # 超过90分钟
-                continue
+        """匹配订单与陪诊员 - 考虑地理距离和时间约束
+
+        陪诊员属性在每次调用开始时整理成 numpy 列数组；每家医院首次出现时向量化计算
+        距离、通勤过滤和匹配分数并缓存，之后逐单（先到先得）只在该医院的候选陪诊员中
+        取最高分者（同分取列表中靠前者）。
+        """
+        if not available_escorts or not self.waiting_queue:
+            return
+
+        # 陪诊员列数组（下标与 escorts 快照对齐）
+        escorts = list(available_escorts)
+        n = len(escorts)
+        limit = self.config.daily_order_limit
+        escort_lat = np.fromiter((e.location_lat for e in escorts), dtype=float, count=n)
+        escort_lon = np.fromiter((e.location_lon for e in escorts), dtype=float, count=n)
+        rating_score = np.fromiter((e.rating for e in escorts), dtype=float, count=n) * 6
+        order_count = np.fromiter(
+            (self.daily_order_count.get(e.id, 0) for e in escorts), dtype=int, count=n
+        )
+        # 可接单掩码：未达日接单上限且当天无时间冲突
+        open_mask = np.fromiter(
+            (c < limit and not self._has_time_conflict(e.id, day)
+             for e, c in zip(escorts, order_count)),
+            dtype=bool, count=n,
+        )
 
-            # 3. 检查时间冲突
-            if self._has_time_conflict(escort.id, day):
+        # 按医院缓存通勤半径内的候选陪诊员下标及其匹配分数（同一医院的订单共用）
+        hospital_candidates: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+        matched_ids = set()
+        for order in self.waiting_queue:
+            if not open_mask.any():
+                break
+
+            hospital = order.user.target_hospital
+            candidates = hospital_candidates.get(hospital)
+            if candidates is None:
+                # 获取医院位置
+                hospital_location = self.hospital_locations.get(hospital)
+                if not hospital_location:
+                    continue
+
+                # 地理距离筛选（通勤时间不超过90分钟）+ 匹配评分
+                specialized = np.fromiter(
+                    (hospital in e.specialized_hospitals for e in escorts), dtype=np.bool_, count=n
+                )
+                idx, scores = score_matches(
+                    escort_lat, escort_lon, rating_score, specialized,
+                    hospital_location["lat"], hospital_location["lon"],
+                )
+                candidates = hospital_candidates[hospital] = (idx, scores)
+
+            # 在候选陪诊员中选择可接单的最高分者
+            idx, scores = candidates
+            feasible = open_mask[idx]
+            if not feasible.any():
                 continue
+            j = int(idx[np.argmax(np.where(feasible, scores, -np.inf))])
+            escort = escorts[j]
+
+            self._assign_order(order, escort, day)
+            matched_ids.add(order.id)
+
+            # 更新掩码；达到日接单上限则从可用列表移除
+            order_count[j] += 1
+            if order_count[j] >= limit:
+                open_mask[j] = False
+                if escort in available_escorts:
+                    available_escorts.remove(escort)
+            else:
+                open_mask[j] = not self._has_time_conflict(escort.id, day)
 
-            # 计算匹配分数
-            score = self._calculate_match_score(escort, order, distance)
-            candidates.append((escort, score, distance))
-
-        if not candidates:
-            return None
-
-        # 按分数排序，选择最佳陪诊员
-        candidates.sort(key=lambda x: x[1], reverse=True)
-        return candidates[0][0]
-
-    def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """计算两点之间的距离（公里）- 使用 Haversine 公式"""
-        R = 6371  # 地球半径（公里）
-
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
-
-        a = (math.sin(delta_lat / 2) ** 2 +
-             math.cos(lat1_rad) * math.cos(lat2_rad) *
-             math.sin(delta_lon / 2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-
-        distance = R * c
-        return distance
-
-    def _estimate_commute_time(self, distance: float) -> float:
-        """估算通勤时间（分钟）"""
-        # 假设平均速度：
-        # - 0-5公里：地铁/公交，20公里/小时
-        # - 5-15公里：地铁，30公里/小时
-        # - 15+公里：地铁+换乘，25公里/小时
-        if distance <= 5:
-            speed = 20
-        elif distance <= 15:
-            speed = 30
-        else:
-            speed = 25
-
-        time_hours = distance / speed
-        time_minutes = time_hours * 60
-        return time_minutes
+        # 从等待队列移除已匹配订单
+        if matched_ids:
+            self.waiting_queue = [o for o in self.waiting_queue if o.id not in matched_ids]
+
+    def _assign_order(self, order: Order, escort: Escort, day: int):
+        """将订单分配给陪诊员并开始服务"""
+        # 匹配成功
+        order.escort = escort
+        order.status = OrderStatus.MATCHED
+        order.matched_at = datetime.now() + timedelta(days=day)
+
+        # 开始服务
+        order.status = OrderStatus.SERVING
+        order.service_start_at = order.matched_at
+        escort.status = EscortStatus.SERVING
+        escort.current_order_id = order.id
+
+        # 生成服务时长
+        order.service_duration = max(0.5, np.random.normal(
+            self.config.service_duration_mean,
+            self.config.service_duration_std
+        ))
+
+        # 更新陪诊员时间表
+        if escort.id not in self.escort_schedule:
+            self.escort_schedule[escort.id] = []
+        service_start_hour = self.config.work_hours[0]  # 使用工作时间窗口起始
+        service_end_hour = service_start_hour + order.service_duration
+        self.escort_schedule[escort.id].append((day, service_start_hour, service_end_hour))
+
+        # 更新陪诊员接单计数
+        self.daily_order_count[escort.id] = self.daily_order_count.get(escort.id, 0) + 1
+
+        # 移到服务中列表
+        self.serving_orders.append(order)
 
     def _has_time_conflict(self, escort_id: str, day: int, order_start_hour: int = 8, order_duration_hours: int = 3) -> bool:
         """检查陪诊师在指定时间段是否有冲突"""
@@ -222,24 +273,6 @@ class EnhancedMatchingEngine:
                     return True
         return False
 
-    def _calculate_match_score(self, escort: Escort, order: Order, distance: float) -> float:
-        """计算匹配分数"""
-        score = 0.0
-
-        # 1. 距离分数（距离越近分数越高，最高50分）
-        distance_score = max(0, 50 - distance * 2)
-        score += distance_score
-
-        # 2. 评分分数（评分越高分数越高，最高30分）
-        rating_score = escort.rating * 6  # 5分制 * 6 = 30分
-        score += rating_score
-
-        # 3. 专业度分数（擅长该医院，加20分）
-        if order.user.target_hospital in escort.specialized_hospitals:
-            score += 20
-
-        return score
-
     def _process_serving_orders(self, day: int):
         """处理服务中的订单"""
         completed = []
@@ -249,7 +282,7 @@ class EnhancedMatchingEngine:
             # 实际可以根据 service_duration 计算完成时间
 
             # 判定服务是否成功
-            is_success = random.random() < self.config.service_success_rate
+            is_success = self.rng.random() < self.config.service_success_rate
 
             if is_success:
                 # 服务成功
@@ -283,9 +316,8 @@ class EnhancedMatchingEngine:
                     order.user.lifecycle_state = "active"
 
                 self.completed_orders.append(order)
-                # 内存保护：截断超出上限的旧记录
-                if len(self.completed_orders) > self._max_completed_records:
-                    self.completed_orders = self.completed_orders[-self._max_completed_records:]
+                self.daily_completed.append(order)
+                self.recent_completed.append((order.user, order.rating))
             else:
                 # 服务失败
                 order.status = OrderStatus.FAILED
@@ -306,7 +338,7 @@ class EnhancedMatchingEngine:
                         day=day,
                     )
 
-                self.failed_orders.append(order)
+                self._record_failed(order)
 
             completed.append(order)
 
@@ -326,7 +358,7 @@ class EnhancedMatchingEngine:
                 order.status = OrderStatus.FAILED
                 order.is_success = False
                 order.cancel_reason = "等待超时，用户取消"
-                self.failed_orders.append(order)
+                self._record_failed(order)
                 timeout_orders.append(order)
 
         # 从等待队列移除
@@ -334,24 +366,39 @@ class EnhancedMatchingEngine:
             if order in self.waiting_queue:
                 self.waiting_queue.remove(order)
 
+    def _record_failed(self, order: Order):
+        """记录失败订单"""
+        self.failed_orders.append(order)
+        self.daily_failed.append(order)
+        self.total_failed_count += 1
+
     def reset_daily_count(self):
         """重置每日接单计数"""
         self.daily_order_count.clear()
+        self.daily_completed = []
+        self.daily_failed = []
         # 清理过期的时间表记录
         # 保留最近7天的记录
         # 这里简化处理，实际应该根据日期清理
 
     def get_statistics(self) -> Dict:
-        """获取履约统计数据"""
+        """获取履约统计数据（同一天内多次调用复用缓存结果）"""
+        if self._stats_cache is None:
+            self._stats_cache = self._compute_statistics()
+        # 返回副本：调用方会在结果上追加字段（如 completed_orders_list）
+        return dict(self._stats_cache)
+
+    def _compute_statistics(self) -> Dict:
+        """计算履约统计数据"""
         total_orders = (
             len(self.completed_orders) +
-            len(self.failed_orders) +
+            self.total_failed_count +
             len(self.serving_orders) +
             len(self.waiting_queue)
         )
 
         completed_count = len(self.completed_orders)
-        failed_count = len(self.failed_orders)
+        failed_count = self.total_failed_count
         completion_rate = completed_count / total_orders if total_orders > 0 else 0
 
         avg_rating = np.mean([o.rating for o in self.completed_orders if o.rating]) \
@@ -71,6 +71,8 @@ class ReferralSystem:
     def __init__(self):
         # 用户 NPS 分类 {user_id: UserNPSCategory}
         self.user_nps: Dict[str, UserNPSCategory] = {}
+        # 各 NPS 分类人数（随 classify_user_nps 增量维护，避免统计时全量扫描）
+        self.nps_counts: Dict[UserNPSCategory, int] = {c: 0 for c in UserNPSCategory}
 
         # 推荐记录
         self.referral_records: List[ReferralRecord] = []
@@ -116,6 +118,10 @@ class ReferralSystem:
         else:
             category = UserNPSCategory.DETRACTOR
 
+        previous = self.user_nps.get(user_id)
+        if previous is not None:
+            self.nps_counts[previous] -= 1
+        self.nps_counts[category] += 1
         self.user_nps[user_id] = category
         return category
 
@@ -185,8 +191,8 @@ class ReferralSystem:
         if not self.user_nps:
             return
 
-        promoters = sum(1 for c in self.user_nps.values() if c == UserNPSCategory.PROMOTER)
-        detractors = sum(1 for c in self.user_nps.values() if c == UserNPSCategory.DETRACTOR)
+        promoters = self.nps_counts[UserNPSCategory.PROMOTER]
+        detractors = self.nps_counts[UserNPSCategory.DETRACTOR]
         total = len(self.user_nps)
 
         self.current_nps = (promoters - detractors) / total if total > 0 else -0.225
@@ -206,9 +212,9 @@ class ReferralSystem:
         self.update_nps_score()
 
         nps_distribution = {
-            "promoters": sum(1 for c in self.user_nps.values() if c == UserNPSCategory.PROMOTER),
-            "passives": sum(1 for c in self.user_nps.values() if c == UserNPSCategory.PASSIVE),
-            "detractors": sum(1 for c in self.user_nps.values() if c == UserNPSCategory.DETRACTOR),
+            "promoters": self.nps_counts[UserNPSCategory.PROMOTER],
+            "passives": self.nps_counts[UserNPSCategory.PASSIVE],
+            "detractors": self.nps_counts[UserNPSCategory.DETRACTOR],
         }
 
         referral_conversion_rate = (
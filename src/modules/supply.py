@@ -3,7 +3,7 @@
 """
 import random
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional
 import numpy as np
 
 from ..config.settings import SimulationConfig
@@ -13,12 +13,15 @@ from ..models.entities import Escort, EscortStatus
 class SupplySimulator:
     """供给模拟器"""
 
-    def __init__(self, config: SimulationConfig):
+    def __init__(self, config: SimulationConfig, rng: Optional[random.Random] = None):
         self.config = config
         self.escorts: Dict[str, Escort] = {}
         self.total_recruit_cost: float = 0.0
 
-        random.seed(config.random_seed)
+        # 随机数发生器：未传入时沿用按 random_seed 播种的全局 random 模块
+        if rng is None:
+            random.seed(config.random_seed)
+        self.rng = rng or random
         np.random.seed(config.random_seed)
 
         # 初始化陪诊员
@@ -34,14 +37,14 @@ class SupplySimulator:
                 join_date=datetime.now(),
                 join_day=0,
                 rating=rating,
-                specialized_hospitals=random.sample(
+                specialized_hospitals=self.rng.sample(
                     self.config.covered_hospitals,
                     k=min(2, len(self.config.covered_hospitals))
                 ),
                 # 随机分配地理位置（北京市区范围）
-                location_lat=random.uniform(39.8, 40.0),
-                location_lon=random.uniform(116.2, 116.5),
-                home_district=random.choice([
+                location_lat=self.rng.uniform(39.8, 40.0),
+                location_lon=self.rng.uniform(116.2, 116.5),
+                home_district=self.rng.choice([
                     "朝阳", "海淀", "西城", "东城", "丰台",
                     "石景山", "昌平", "大兴", "通州", "房山"
                 ]),
@@ -80,14 +83,14 @@ class SupplySimulator:
                 join_date=datetime.now(),
                 join_day=day,
                 rating=rating,
-                specialized_hospitals=random.sample(
+                specialized_hospitals=self.rng.sample(
                     self.config.covered_hospitals,
                     k=min(2, len(self.config.covered_hospitals))
                 ),
                 # 随机分配地理位置（北京市区范围）
-                location_lat=random.uniform(39.8, 40.0),
-                location_lon=random.uniform(116.2, 116.5),
-                home_district=random.choice([
+                location_lat=self.rng.uniform(39.8, 40.0),
+                location_lon=self.rng.uniform(116.2, 116.5),
+                home_district=self.rng.choice([
                     "朝阳", "海淀", "西城", "东城", "丰台",
                     "石景山", "昌平", "大兴", "通州", "房山"
                 ]),
@@ -103,7 +106,7 @@ class SupplySimulator:
                 days_since_join = day - escort.join_day
                 if days_since_join >= self.config.training_days:
                     # 判定是否通过培训
-                    if random.random() < self.config.training_pass_rate:
+                    if self.rng.random() < self.config.training_pass_rate:
                         escort.status = EscortStatus.AVAILABLE
                         escort.training_complete_date = datetime.now() + timedelta(days=day)
                     else:
@@ -143,7 +146,7 @@ class SupplySimulator:
             tier = self.get_income_tier(escort)
             base_churn = churn_rate_by_tier[tier]
             churn_prob = base_churn * escort.churn_risk
-            if random.random() < churn_prob:
+            if self.rng.random() < churn_prob:
                 escort.status = EscortStatus.CHURNED
 
     def _reset_daily_capacity(self):
@@ -43,7 +43,7 @@ class Simulation:
             complaint_handler=self.complaint_handler,
             geo_matcher=self.geo_matcher,
         )
-        self.analytics = Analytics()
+        self.analytics = Analytics(parquet_path=config.metrics_parquet_path)
 
         # LLM 客户端（可选）
         self.llm_client: Optional[LLMClient] = None
@@ -4,6 +4,7 @@
 from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any, List
 import random
+from contextlib import nullcontext
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 
@@ -18,7 +19,7 @@ class BaseSimulation(ABC):
         self.config = config
 
         # 初始化分析模块（所有子类共用）
-        self.analytics = Analytics()
+        self.analytics = Analytics(parquet_path=config.metrics_parquet_path)
 
         # 初始化控制台
         self.console = Console()
@@ -26,11 +27,28 @@ class BaseSimulation(ABC):
         # 子类特定的模块初始化
         self._init_modules()
 
+        # 单日流程各步骤的绑定方法（模块初始化后即固定，预先绑定省去逐日属性查找）
+        # 子类未覆盖的空钩子记为 None，逐日流程中直接跳过
+        self._pipeline = (
+            self._update_supply,
+            self._generate_demand,
+            self._get_available_escorts,
+            self._process_matching,
+            self._handle_llm_events if self._overrides("_handle_llm_events") else None,
+            self._update_repurchase_pool,
+            self._record_daily_metrics,
+            self._reset_daily_state,
+        )
+
     @abstractmethod
     def _init_modules(self):
         """初始化业务模块 - 子类必须实现"""
         pass
 
+    def _overrides(self, hook_name: str) -> bool:
+        """子类是否覆盖了指定钩子方法"""
+        return getattr(type(self), hook_name) is not getattr(BaseSimulation, hook_name)
+
     def run(self, verbose: bool = True) -> SimulationResult:
         """
         模板方法: 运行模拟的主流程
@@ -43,29 +61,39 @@ class BaseSimulation(ABC):
         self._print_start_message()
 
         # 主循环
-        with Progress(
+        # 非 verbose（批量/无头运行）时不创建 Rich 进度条，省去逐日渲染开销
+        progress_cm = Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             BarColumn(),
             TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
             console=self.console,
-        ) as progress:
-            task = progress.add_task(
-                "[cyan]模拟进行中...",
-                total=self.config.total_days
-            )
+        ) if verbose else nullcontext()
+
+        after_day_simulation = (
+            self._after_day_simulation if self._overrides("_after_day_simulation") else None
+        )
+
+        with progress_cm as progress:
+            if verbose:
+                task = progress.add_task(
+                    "[cyan]模拟进行中...",
+                    total=self.config.total_days
+                )
 
             for day in range(self.config.total_days):
                 # 模拟单日
                 self._simulate_day(day)
-                progress.update(task, advance=1)
 
-                # 定期打印进度
-                if verbose and day % 10 == 0:
-                    self._print_progress(day)
+                # 更新进度 / 定期打印进度
+                if verbose:
+                    progress.update(task, advance=1)
+                    if day % 10 == 0:
+                        self._print_progress(day)
 
                 # 钩子: 每日模拟后
-                self._after_day_simulation(day)
+                if after_day_simulation is not None:
+                    after_day_simulation(day)
 
         # 生成报告
         result = self._generate_final_report()
@@ -84,29 +112,34 @@ class BaseSimulation(ABC):
         模板方法: 单日模拟流程
         定义标准8步流程，子类可通过钩子扩展
         """
+        (update_supply, generate_demand, get_available_escorts, process_matching,
+         handle_llm_events, update_repurchase_pool, record_daily_metrics,
+         reset_daily_state) = self._pipeline
+
         # 步骤1: 更新供给状态
-        self._update_supply(day)
+        update_supply(day)
 
         # 步骤2: 生成需求
-        new_orders = self._generate_demand(day)
+        new_orders = generate_demand(day)
 
         # 步骤3: 获取可用陪诊员
-        available_escorts = self._get_available_escorts()
+        available_escorts = get_available_escorts()
 
         # 步骤4: 订单匹配与履约
-        self._process_matching(new_orders, available_escorts, day)
+        process_matching(new_orders, available_escorts, day)
 
         # 步骤5: 处理LLM事件（钩子）
-        self._handle_llm_events(day)
+        if handle_llm_events is not None:
+            handle_llm_events(day)
 
         # 步骤6: 更新复购池
-        self._update_repurchase_pool()
+        update_repurchase_pool()
 
         # 步骤7: 记录每日指标
-        self._record_daily_metrics(day, new_orders)
+        record_daily_metrics(day, new_orders)
 
         # 步骤8: 重置每日状态
-        self._reset_daily_state()
+        reset_daily_state()
 
     @abstractmethod
     def _update_supply(self, day: int):
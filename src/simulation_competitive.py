@@ -1,9 +1,13 @@
 """
 竞争版模拟引擎 - 包含市场竞争模拟
 """
-import random
-from typing import Optional
-import pandas as pd
+import queue
+import threading
+from contextlib import nullcontext
+from concurrent.futures import Future
+from functools import partial
+from typing import List, Optional
+import numpy as np
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 from rich.table import Table
@@ -19,7 +23,7 @@ from .modules.complaint_handler import ComplaintHandler
 from .modules.referral_system import ReferralSystem
 from .modules.event_generator import EventGenerator
 from .modules.geo_matcher import GeoMatcher
-from .llm.client import LLMClient
+from .llm.client import CachingLLMClient, LLMClient
 
 
 class CompetitiveSimulation:
@@ -35,7 +39,7 @@ class CompetitiveSimulation:
         # 初始化模块
         self.demand_gen = EnhancedDemandGenerator(config, self.beijing_data)
         self.supply_sim = SupplySimulator(config)
-        self.analytics = Analytics()
+        self.analytics = Analytics(parquet_path=config.metrics_parquet_path)
 
         # 竞争模拟器
         self.competition_sim = CompetitionSimulator(config)
@@ -57,45 +61,88 @@ class CompetitiveSimulation:
         )
 
         # 政策风险事件生成器
-        self.event_generator = EventGenerator(pd.DataFrame())
+        self.event_generator = EventGenerator()
 
         # LLM 客户端（可选）
         self.llm_client: Optional[LLMClient] = None
         if config.enable_llm:
             try:
-                self.llm_client = LLMClient(
+                self.llm_client = CachingLLMClient(
                     provider=config.llm_provider,
-                    model=config.llm_model
+                    model=config.llm_model,
+                    cache_path=config.llm_cache_path,
                 )
             except Exception as e:
                 print(f"LLM 初始化失败: {e}，将禁用 LLM 功能")
                 self.llm_client = None
 
+        # 本模拟自身的随机数发生器（各业务模块仍按 config.random_seed 自行播种）
+        self._rng = np.random.default_rng(config.random_seed)
+
+        # LLM 开关与触发概率在模拟期间不变，提前确定，避免逐日判断
+        self._llm_enabled = self.llm_client is not None
+        self._llm_prob = config.llm_event_probability if self._llm_enabled else 0.0
+        # 预先抽取每日 LLM 事件的随机数，按 day 取用
+        self._llm_coins = self._rng.random(config.total_days)
+        # 进行中的 LLM 事件请求（后台线程执行，不阻塞逐日模拟）
+        self._pending_llm_events: List[Future] = []
+
         self.console = Console()
+        self._verbose = True
+        # 逐日进度/事件日志队列，由后台线程输出到控制台（None 为结束标记）
+        self._log_q: "queue.Queue[Optional[str]]" = queue.Queue()
 
     def run(self, verbose: bool = True) -> SimulationResult:
         """运行模拟"""
+        try:
+            return self._run(verbose)
+        finally:
+            # 后台请求结束后关闭 LLM 客户端，落盘缓存在此写回
+            if self.llm_client:
+                self.llm_client.close()
+
+    def _run(self, verbose: bool) -> SimulationResult:
+        """运行模拟主体（LLM 客户端由 run() 负责关闭）"""
+        self._verbose = verbose
         self.console.print(f"\n[bold cyan]🚀 开始竞争版模拟 - 共 {self.config.total_days} 天[/bold cyan]")
         self.console.print("[dim]包含市场竞争：医院自营40%、个人陪诊师35%、滴滴15%、其他平台10%[/dim]\n")
 
-        with Progress(
+        # 非 verbose（批量/无头运行）时不创建 Rich 进度条，省去逐日渲染开销
+        progress_cm = Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             BarColumn(),
             TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
             console=self.console,
-        ) as progress:
-            task = progress.add_task(
-                "[cyan]模拟进行中...",
-                total=self.config.total_days
-            )
+        ) if verbose else nullcontext()
+
+        log_thread = threading.Thread(target=self._log_worker, daemon=True)
+        log_thread.start()
+
+        with progress_cm as progress:
+            if verbose:
+                task = progress.add_task(
+                    "[cyan]模拟进行中...",
+                    total=self.config.total_days
+                )
 
             for day in range(self.config.total_days):
                 self._simulate_day(day)
-                progress.update(task, advance=1)
 
-                if verbose and day % 10 == 0:
-                    self._print_progress(day)
+                if verbose:
+                    progress.update(task, advance=1)
+                    if day % 10 == 0:
+                        self._print_progress(day)
+
+        # 等待尚未返回的 LLM 事件。wait() 可能在完成回调执行前就返回，
+        # 故关闭线程池：回调都执行完后，其日志才保证排在结束标记之前
+        if self.llm_client:
+            self.llm_client.shutdown()
+        self._pending_llm_events.clear()
+
+        # 输出剩余日志后结束日志线程
+        self._log_q.put(None)
+        log_thread.join()
 
         # 生成最终报告
         result = self._generate_final_report()
@@ -104,6 +151,8 @@ class CompetitiveSimulation:
         self._print_summary(result)
         self._print_competition_summary()
 
+        self._print_llm_cache_stats()
+
         return result
 
     def _simulate_day(self, day: int):
@@ -123,7 +172,10 @@ class CompetitiveSimulation:
         policy_modifier = self.event_generator.get_active_policy_demand_modifier(day)
         if policy_modifier < 0:
             keep_ratio = max(0.1, 1 + policy_modifier)
-            base_orders = random.sample(base_orders, int(len(base_orders) * keep_ratio))
+            keep_idx = self._rng.choice(
+                len(base_orders), size=int(len(base_orders) * keep_ratio), replace=False
+            )
+            base_orders = [base_orders[i] for i in keep_idx]
 
         # 根据市场份额调整订单量（订单量已基于滴滴流量生成，不需要额外调整）
 
@@ -153,11 +205,11 @@ class CompetitiveSimulation:
         )
 
         # 7. 计算流失到竞品的用户
-        failed_orders = len(self.matching_engine.failed_orders)
+        failed_orders = self.matching_engine.total_failed_count
         churned_users = self.competition_sim.calculate_user_churn_to_competitors(failed_orders)
 
         # 8. LLM 事件生成（可选）
-        if self.llm_client and random.random() < self.config.llm_event_probability:
+        if self._llm_enabled and self._llm_coins[day] < self._llm_prob:
             self._trigger_llm_event(day)
 
         # 9. 将完成订单的用户加入复购池
@@ -173,8 +225,8 @@ class CompetitiveSimulation:
                 # 推荐者尝试推荐新用户
                 self.referral_system.simulate_referral(order.user.id, day)
 
-        # 9.5 投诉处理（集成 complaint_handler）
-        for order in self.matching_engine.failed_orders:
+        # 9.5 投诉处理（集成 complaint_handler，仅处理当日失败订单）
+        for order in self.matching_engine.daily_failed:
             if order.cancel_reason and order.cancel_reason != "超时未匹配":
                 self.complaint_handler.generate_complaint(
                     order_id=order.id,
@@ -187,8 +239,8 @@ class CompetitiveSimulation:
 
         # 9.7 负面口碑传播（差评用户）
         detractors = [
-            o.user for o in self.matching_engine.completed_orders[-50:]
-            if o.rating and o.rating < 3.5
+            user for user, rating in self.matching_engine.recent_completed
+            if rating and rating < 3.5
         ]
         if detractors:
             self.referral_system.simulate_negative_word_of_mouth(detractors)
@@ -209,9 +261,27 @@ class CompetitiveSimulation:
             "market_share": self.competition_sim.get_our_market_share(),
         }
 
-        event = self.llm_client.generate_event(state) if self.llm_client else None
-        if event:
-            self.console.print(f"\n[yellow]📢 突发事件（第{day}天）：{event.get('description', '')}[/yellow]\n")
+        future = self.llm_client.generate_event_async(state)
+        future.add_done_callback(partial(self._on_llm_event, day))
+        self._pending_llm_events.append(future)
+
+    def _on_llm_event(self, day: int, future: Future):
+        """LLM 事件返回后的回调（在后台线程中执行）"""
+        event = future.result()
+        if event and self._verbose:
+            self._log(f"\n[yellow]📢 突发事件（第{day}天）：{event.get('description', '')}[/yellow]\n")
+
+    def _log(self, msg: str):
+        """将日志放入队列，由后台线程输出"""
+        self._log_q.put(msg)
+
+    def _log_worker(self):
+        """后台日志线程：逐条输出队列中的日志，收到结束标记后退出"""
+        while True:
+            msg = self._log_q.get()
+            if msg is None:
+                break
+            self.console.print(msg)
 
     def _record_daily_metrics(self, day: int, new_orders: list, churned_users: int):
         """记录每日指标"""
@@ -277,13 +347,21 @@ class CompetitiveSimulation:
         """打印进度信息"""
         stats = self.matching_engine.get_statistics()
         market_share = self.competition_sim.get_our_market_share()
-        self.console.print(
+        self._log(
             f"第 {day} 天 | "
             f"订单: {stats['completed_orders']} | "
             f"完成率: {stats['completion_rate']:.1%} | "
             f"市场份额: {market_share:.1%}"
         )
 
+    def _print_llm_cache_stats(self):
+        """打印 LLM 响应缓存命中情况"""
+        if isinstance(self.llm_client, CachingLLMClient):
+            stats = self.llm_client.cache_stats()
+            self.console.print(
+                f"[dim]LLM 缓存：命中 {stats['hits']} 次，未命中 {stats['misses']} 次[/dim]"
+            )
+
     def _print_summary(self, result: SimulationResult):
         """打印汇总信息"""
         self.console.print("\n[bold]━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━[/bold]")
@@ -1,8 +1,15 @@
 """
 增强版模拟引擎 - 使用真实数据
 """
+import os
 import random
-from typing import Optional
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import replace
+from functools import partial
+from itertools import repeat
+from typing import Dict, List, Optional
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 
@@ -12,7 +19,7 @@ from .modules.demand_enhanced import EnhancedDemandGenerator
 from .modules.supply import SupplySimulator
 from .modules.matching_enhanced import EnhancedMatchingEngine
 from .modules.analytics import Analytics, SimulationResult
-from .llm.client import LLMClient
+from .llm.client import CachingLLMClient, LLMClient
 
 
 class EnhancedSimulation:
@@ -24,61 +31,109 @@ class EnhancedSimulation:
 
         # 加载北京真实数据
         self.beijing_data = beijing_data or BeijingRealDataConfig()
+        # 渠道名称表（下标即 AcquisitionChannel 编号，末位 None 对应无渠道订单）
+        self._channel_names = [c["name"] for c in self.beijing_data.acquisition_channels] + [None]
+
+        # 本模拟独享的随机数发生器，各模块共用，不依赖全局 random 状态
+        self.rng = random.Random(config.random_seed)
 
         # 初始化模块
-        self.demand_gen = EnhancedDemandGenerator(config, self.beijing_data)
-        self.supply_sim = SupplySimulator(config)
-        self.matching_engine = EnhancedMatchingEngine(config, self.beijing_data)
-        self.analytics = Analytics()
+        self.demand_gen = EnhancedDemandGenerator(config, self.beijing_data, rng=self.rng)
+        self.supply_sim = SupplySimulator(config, rng=self.rng)
+        self.matching_engine = EnhancedMatchingEngine(config, self.beijing_data, rng=self.rng)
+        self.analytics = Analytics(parquet_path=config.metrics_parquet_path)
 
         # LLM 客户端（可选）
         self.llm_client: Optional[LLMClient] = None
         if config.enable_llm:
             try:
-                self.llm_client = LLMClient(
+                self.llm_client = CachingLLMClient(
                     provider=config.llm_provider,
-                    model=config.llm_model
+                    model=config.llm_model,
+                    cache_path=config.llm_cache_path,
                 )
             except Exception as e:
                 print(f"LLM 初始化失败: {e}，将禁用 LLM 功能")
                 self.llm_client = None
 
+        # 进行中的 LLM 请求（后台线程执行，不阻塞逐日模拟）
+        self._pending_llm_events: List[Future] = []
+        self._pending_report: Optional[Future] = None
+
         self.console = Console()
+        self._verbose = True
 
     def run(self, verbose: bool = True) -> SimulationResult:
         """运行模拟"""
+        try:
+            return self._run(verbose)
+        finally:
+            # 后台请求结束后关闭 LLM 客户端，落盘缓存在此写回
+            if self.llm_client:
+                self.llm_client.close()
+
+    def _run(self, verbose: bool) -> SimulationResult:
+        """运行模拟主体（LLM 客户端由 run() 负责关闭）"""
+        self._verbose = verbose
         self.console.print(f"\n[bold cyan]🚀 开始增强版模拟 - 共 {self.config.total_days} 天[/bold cyan]")
         self.console.print("[dim]使用北京真实数据：医院、疾病分布、区域付费能力、多渠道获客[/dim]\n")
 
-        with Progress(
+        # 仅在交互终端中使用 Rich 进度条；非 verbose 或输出被重定向（CI、批量运行）时
+        # 不创建进度条及其刷新线程，verbose 时改为每 10 天打印一行进度
+        show_bar = verbose and self.console.is_terminal
+        progress_cm = Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             BarColumn(),
             TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
             console=self.console,
-        ) as progress:
-            task = progress.add_task(
-                "[cyan]模拟进行中...",
-                total=self.config.total_days
-            )
+        ) if show_bar else nullcontext()
 
-            for day in range(self.config.total_days):
-                self._simulate_day(day)
-                progress.update(task, advance=1)
+        with progress_cm as progress:
+            if show_bar:
+                task = progress.add_task(
+                    "[cyan]模拟进行中...",
+                    total=self.config.total_days
+                )
 
-                if verbose and day % 10 == 0:
-                    self._print_progress(day)
+            for day in range(self.config.total_days):
+                stats = self._simulate_day(day)
+
+                if show_bar:
+                    # 进度信息写入进度条描述，复用 Progress 的渲染，不再逐条打印
+                    if day % 10 == 0:
+                        progress.update(task, advance=1,
+                                        description=self._progress_description(day, stats))
+                    else:
+                        progress.update(task, advance=1)
+                elif verbose and day % 10 == 0:
+                    self.console.print(
+                        f"{self._progress_description(day, stats)} | {day + 1}/{self.config.total_days}"
+                    )
+
+        # 等待尚未返回的 LLM 事件。wait() 可能在完成回调执行前就返回，
+        # 故关闭线程池：回调中的事件输出都完成后才打印完成信息与汇总
+        if self.llm_client:
+            self.llm_client.shutdown()
+        self._pending_llm_events.clear()
 
-        # 生成最终报告
+        # 生成最终报告（AI 分析报告在后台生成）
         result = self._generate_final_report()
 
         self.console.print("\n[bold green]✓ 模拟完成！[/bold green]\n")
         self._print_summary(result)
 
+        # 取回 AI 分析报告
+        if self._pending_report is not None:
+            result.llm_report = self._pending_report.result()
+            self._pending_report = None
+
+        self._print_llm_cache_stats()
+
         return result
 
-    def _simulate_day(self, day: int):
-        """模拟单日运转"""
+    def _simulate_day(self, day: int) -> Dict:
+        """模拟单日运转，返回当日履约统计"""
         # 1. 更新供给状态
         self.supply_sim.daily_update(day)
 
@@ -87,49 +142,64 @@ class EnhancedSimulation:
 
         # 3. 获取可用陪诊员
         available_escorts = self.supply_sim.get_available_escorts()
+        # 匹配会从列表中移除接满单的陪诊员，先记下当日可用人数
+        available_escorts_count = len(available_escorts)
 
         # 4. 订单匹配与履约
         self.matching_engine.process_orders(new_orders, available_escorts, day)
+        # 当日履约统计只取一次，供后续步骤共用
+        stats = self.matching_engine.get_statistics()
 
         # 5. LLM 事件生成（可选）
-        if self.llm_client and random.random() < self.config.llm_event_probability:
-            self._trigger_llm_event(day)
+        if self.llm_client and self.rng.random() < self.config.llm_event_probability:
+            self._trigger_llm_event(day, stats, available_escorts_count)
 
-        # 6. 将完成订单的用户加入复购池
-        for order in self.matching_engine.completed_orders:
-            if order.is_success and order.rating and order.rating >= 4.0:
+        # 6. 将当日完成订单的用户加入复购池
+        for order in self.matching_engine.daily_completed:
+            if order.rating is not None and order.rating >= 4.0 and order.is_success:
                 self.demand_gen.add_to_repurchase_pool(order.user, order.rating)
 
         # 7. 记录每日数据（使用增强版统计）
-        self._record_daily_metrics(day, new_orders)
+        self._record_daily_metrics(day, new_orders, stats)
 
         # 8. 重置每日计数
         self.matching_engine.reset_daily_count()
 
-    def _trigger_llm_event(self, day: int):
+        return stats
+
+    def _trigger_llm_event(self, day: int, stats: Dict, available_escorts_count: int):
         """触发 LLM 事件"""
         state = {
             "day": day,
             "total_orders": len(self.matching_engine.completed_orders),
-            "available_escorts": len(self.supply_sim.get_available_escorts()),
-            "completion_rate": self.matching_engine.get_statistics().get("completion_rate", 0),
+            "available_escorts": available_escorts_count,
+            "completion_rate": stats.get("completion_rate", 0),
         }
 
-        event = self.llm_client.generate_event(state)
-        if event:
+        future = self.llm_client.generate_event_async(state)
+        future.add_done_callback(partial(self._on_llm_event, day))
+        self._pending_llm_events.append(future)
+
+    def _on_llm_event(self, day: int, future: Future):
+        """LLM 事件返回后的回调（在后台线程中执行）"""
+        event = future.result()
+        if event and self._verbose:
             self.console.print(f"\n[yellow]📢 突发事件（第{day}天）：{event.get('description', '')}[/yellow]\n")
 
-    def _record_daily_metrics(self, day: int, new_orders: list):
+    def _record_daily_metrics(self, day: int, new_orders: list, stats: Dict):
         """记录每日指标 - 增强版"""
-        # 统计新订单和复购订单
-        new_orders_count = len([o for o in new_orders if not o.user.is_repurchase])
-        repurchase_orders_count = len([o for o in new_orders if o.user.is_repurchase])
-
-        # 统计各渠道订单数
-        channel_stats = {}
+        # 单次遍历统计新订单、复购订单及各渠道订单数
+        # 渠道计数按 AcquisitionChannel 编号下标累加，末位（下标 -1）记无渠道订单
+        repurchase_orders_count = 0
+        channel_counts = [0] * len(self._channel_names)
         for order in new_orders:
-            channel = getattr(order, 'acquisition_channel', '未知')
-            channel_stats[channel] = channel_stats.get(channel, 0) + 1
+            if order.user.is_repurchase:
+                repurchase_orders_count += 1
+            channel_counts[order.acquisition_channel_id] += 1
+        channel_stats = {
+            name: count for name, count in zip(self._channel_names, channel_counts) if count
+        }
+        new_orders_count = len(new_orders) - repurchase_orders_count
 
         demand_stats = {
             "new_orders": new_orders_count,
@@ -141,8 +211,7 @@ class EnhancedSimulation:
         supply_stats = self.supply_sim.get_statistics()
         supply_stats["daily_recruit_cost"] = 0  # 简化处理
 
-        matching_stats = self.matching_engine.get_statistics()
-        matching_stats["completed_orders_list"] = self.matching_engine.completed_orders
+        matching_stats = {**stats, "completed_orders_list": self.matching_engine.completed_orders}
 
         self.analytics.record_daily(day, demand_stats, supply_stats, matching_stats, self.config)
 
@@ -165,59 +234,29 @@ class EnhancedSimulation:
                 "avg_net_margin": result.avg_net_margin,
                 "ltv_cac_ratio": result.ltv_cac_ratio,
             }
-            result.llm_report = self.llm_client.generate_analysis_report(report_data)
+            # 提交到后台生成，run() 结束前取回结果
+            self._pending_report = self.llm_client.generate_analysis_report_async(report_data)
 
         return result
 
-    def _print_progress(self, day: int):
-        """打印进度信息"""
-        stats = self.matching_engine.get_statistics()
-        self.console.print(
-            f"第 {day} 天 | "
+    def _progress_description(self, day: int, stats: Dict) -> str:
+        """进度条描述：当前天数与履约概况"""
+        return (
+            f"[cyan]第 {day} 天 | "
             f"订单: {stats['completed_orders']} | "
             f"完成率: {stats['completion_rate']:.1%}"
         )
 
-    def _print_summary(self, result: SimulationResult):
-        """打印汇总信息"""
-        self.console.print("\n[bold]━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━[/bold]")
-        self.console.print("[bold cyan]📊 增强版模拟结果汇总[/bold cyan]")
-        self.console.print("[bold]━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━[/bold]\n")
-
-        # 订单指标
-        self.console.print("[bold yellow]📦 订单指标[/bold yellow]")
-        self.console.print(f"  总订单数: {result.total_orders:,}")
-        self.console.print(f"  完成订单数: {result.total_completed:,}")
-        self.console.print(f"  平均完成率: {result.avg_completion_rate:.1%}")
-        self.console.print(f"  平均客单价: ¥{result.avg_order_value:.2f}\n")
-
-        # 收入指标
-        self.console.print("[bold green]💰 收入指标[/bold green]")
-        self.console.print(f"  总 GMV: ¥{result.total_gmv:,.2f}\n")
-
-        # 成本指标
-        self.console.print("[bold red]💸 成本指标[/bold red]")
-        self.console.print(f"  陪诊员分成: ¥{result.total_escort_cost:,.2f}")
-        self.console.print(f"  获客成本(CAC): ¥{result.total_cac_cost:,.2f}")
-        self.console.print(f"  平台抽成: ¥{result.total_platform_cost:,.2f}")
-        self.console.print(f"  保险成本: ¥{result.total_insurance_cost:,.2f}")
-        self.console.print(f"  运营成本: ¥{result.total_operation_cost:,.2f}")
-        self.console.print(f"  招募成本: ¥{result.total_recruit_cost:,.2f}")
-        self.console.print(f"  [bold]总成本: ¥{result.total_cost:,.2f}[/bold]\n")
-
-        # 利润指标
-        self.console.print("[bold magenta]📈 利润指标[/bold magenta]")
-        self.console.print(f"  毛利: ¥{result.total_gross_profit:,.2f}")
-        self.console.print(f"  毛利率: {result.avg_margin:.1%}")
-        self.console.print(f"  净利: ¥{result.total_net_profit:,.2f}")
-        self.console.print(f"  净利率: {result.avg_net_margin:.1%}\n")
-
-        # 单位经济模型
-        self.console.print("[bold blue]🎯 单位经济模型[/bold blue]")
-        self.console.print(f"  平均获客成本(CAC): ¥{result.avg_cac:.2f}")
-        self.console.print(f"  平均用户价值(LTV): ¥{result.avg_ltv:.2f}")
-        self.console.print(f"  LTV/CAC 比率: {result.ltv_cac_ratio:.2f}")
+    def _print_llm_cache_stats(self):
+        """打印 LLM 响应缓存命中情况"""
+        if isinstance(self.llm_client, CachingLLMClient):
+            stats = self.llm_client.cache_stats()
+            self.console.print(
+                f"[dim]LLM 缓存：命中 {stats['hits']} 次，未命中 {stats['misses']} 次[/dim]"
+            )
 
+    def _print_summary(self, result: SimulationResult):
+        """打印汇总信息（拼接为单个字符串一次输出）"""
         # 健康度评估
         if result.ltv_cac_ratio > 3:
             health_status = "[bold green]✓ 健康[/bold green]"
@@ -225,6 +264,93 @@ class EnhancedSimulation:
             health_status = "[bold yellow]⚠ 需改进[/bold yellow]"
         else:
             health_status = "[bold red]✗ 不健康[/bold red]"
-        self.console.print(f"  商业模式健康度: {health_status}")
 
-        self.console.print("\n[bold]━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━[/bold]\n")
+        lines = [
+            "\n[bold]━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━[/bold]",
+            "[bold cyan]📊 增强版模拟结果汇总[/bold cyan]",
+            "[bold]━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━[/bold]\n",
+
+            # 订单指标
+            "[bold yellow]📦 订单指标[/bold yellow]",
+            f"  总订单数: {result.total_orders:,}",
+            f"  完成订单数: {result.total_completed:,}",
+            f"  平均完成率: {result.avg_completion_rate:.1%}",
+            f"  平均客单价: ¥{result.avg_order_value:.2f}\n",
+
+            # 收入指标
+            "[bold green]💰 收入指标[/bold green]",
+            f"  总 GMV: ¥{result.total_gmv:,.2f}\n",
+
+            # 成本指标
+            "[bold red]💸 成本指标[/bold red]",
+            f"  陪诊员分成: ¥{result.total_escort_cost:,.2f}",
+            f"  获客成本(CAC): ¥{result.total_cac_cost:,.2f}",
+            f"  平台抽成: ¥{result.total_platform_cost:,.2f}",
+            f"  保险成本: ¥{result.total_insurance_cost:,.2f}",
+            f"  运营成本: ¥{result.total_operation_cost:,.2f}",
+            f"  招募成本: ¥{result.total_recruit_cost:,.2f}",
+            f"  [bold]总成本: ¥{result.total_cost:,.2f}[/bold]\n",
+
+            # 利润指标
+            "[bold magenta]📈 利润指标[/bold magenta]",
+            f"  毛利: ¥{result.total_gross_profit:,.2f}",
+            f"  毛利率: {result.avg_margin:.1%}",
+            f"  净利: ¥{result.total_net_profit:,.2f}",
+            f"  净利率: {result.avg_net_margin:.1%}\n",
+
+            # 单位经济模型
+            "[bold blue]🎯 单位经济模型[/bold blue]",
+            f"  平均获客成本(CAC): ¥{result.avg_cac:.2f}",
+            f"  平均用户价值(LTV): ¥{result.avg_ltv:.2f}",
+            f"  LTV/CAC 比率: {result.ltv_cac_ratio:.2f}",
+            f"  商业模式健康度: {health_status}",
+
+            "\n[bold]━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━[/bold]\n",
+        ]
+        self.console.print("\n".join(lines))
+
+
+def _run_scenario(config: SimulationConfig,
+                  beijing_data: Optional[BeijingRealDataConfig] = None) -> SimulationResult:
+    """进程池工作函数：在子进程中静默运行单个场景（关闭 LLM，不输出到控制台）"""
+    sim = EnhancedSimulation(replace(config, enable_llm=False), beijing_data)
+    sim.console = Console(quiet=True)
+    return sim.run(verbose=False)
+
+
+def _scenario_path(path: str, index: int) -> str:
+    """为第 index 个场景派生独立的输出路径：metrics.parquet -> metrics_3.parquet"""
+    root, ext = os.path.splitext(path)
+    return f"{root}_{index}{ext}"
+
+
+def run_scenarios(
+    configs: List[SimulationConfig],
+    workers: Optional[int] = None,
+    beijing_data: Optional[BeijingRealDataConfig] = None,
+) -> List[SimulationResult]:
+    """
+    多进程并行运行多组参数场景
+
+    Args:
+        configs: 各场景的模拟配置
+        workers: 进程数（默认为 CPU 核数）
+        beijing_data: 各场景共用的北京数据配置（默认各子进程自行加载默认配置）
+
+    Returns:
+        List[SimulationResult]: 与 configs 顺序一致的模拟结果
+
+    多个场景共用同一 metrics_parquet_path 时（如由同一基础配置复制而来），
+    各自改写为带场景下标的路径，避免多个进程同时写同一文件。子进程关闭 LLM，
+    不会打开 llm_cache_path。
+    """
+    counts = Counter(c.metrics_parquet_path for c in configs if c.metrics_parquet_path)
+    configs = [
+        replace(c, metrics_parquet_path=_scenario_path(c.metrics_parquet_path, i))
+        if counts.get(c.metrics_parquet_path, 0) > 1 else c
+        for i, c in enumerate(configs)
+    ]
+
+    # 各模块按 config.random_seed 播种，结果可复现
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_run_scenario, configs, repeat(beijing_data)))
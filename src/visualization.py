@@ -2,47 +2,107 @@
 可视化模块
 """
 import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import pandas as pd
-from typing import List
+from functools import reduce
+from typing import List, Optional
+import numpy as np
 
 from .modules.analytics import SimulationResult, DailyMetrics
 
+# 逐日序列超过该长度时先用 LTTB 为每个序列选取该数量的点再出图
+MAX_PLOT_POINTS = 1000
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets 降采样，返回保留点的下标：保留首尾点，其余每桶取与相邻点围成三角形面积最大的点"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    xf = np.asarray(x, dtype=np.float64)
+    yf = np.asarray(y, dtype=np.float64)
+    # 中间 n - 2 个点均分为 n_out - 2 个桶
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # 下一个桶（最后一桶之后为末点）的均值点
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = xf[end:next_end].mean()
+        avg_y = yf[end:next_end].mean()
+        area = np.abs(
+            (xf[a] - avg_x) * (yf[start:end] - yf[a]) -
+            (xf[a] - xf[start:end]) * (avg_y - yf[a])
+        )
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+
+    return idx
+
 
 class Visualizer:
     """可视化工具"""
 
     def __init__(self, result: SimulationResult):
         self.result = result
-        self.df = result.to_dataframe()
+        # 逐日指标列数组，直接传给 Plotly，无需构造 DataFrame
+        self.data = result.to_arrays()
+        # 百分比序列只换算一次，重复出图时直接复用
+        self._margin_pct = self.data['margin_rate'] * 100
+        self._completion_pct = self.data['completion_rate'] * 100
+
+    def _plot_index(self, *series: np.ndarray) -> Optional[np.ndarray]:
+        """一张图内所有 trace 共用的降采样下标
+
+        取各序列 LTTB 选点的并集，各序列的峰谷都保留，且所有 trace 的 x 对齐，
+        hovermode='x unified' 时同一天显示全部序列；序列不长时返回 None（不降采样）
+        """
+        x = self.data['day']
+        if len(x) <= MAX_PLOT_POINTS:
+            return None
+        return reduce(np.union1d, (lttb_indices(x, y, MAX_PLOT_POINTS) for y in series))
+
+    def _scatter(self, y: np.ndarray, idx: Optional[np.ndarray] = None, **kwargs):
+        """折线 trace：idx 为 _plot_index 给出的共用下标时按其取点"""
+        x = self.data['day']
+        if idx is not None:
+            x, y = x[idx], y[idx]
+        return go.Scatter(x=x, y=y, **kwargs)
 
     def plot_order_trend(self, save_path: str = None):
         """订单趋势图"""
-        fig = go.Figure()
-
-        fig.add_trace(go.Scatter(
-            x=self.df['day'],
-            y=self.df['total_orders'],
-            mode='lines+markers',
-            name='总订单',
-            line=dict(color='blue', width=2)
-        ))
-
-        fig.add_trace(go.Scatter(
-            x=self.df['day'],
-            y=self.df['completed_orders'],
-            mode='lines+markers',
-            name='完成订单',
-            line=dict(color='green', width=2)
-        ))
-
-        fig.update_layout(
-            title='订单趋势',
-            xaxis_title='天数',
-            yaxis_title='订单数',
-            hovermode='x unified',
-            template='plotly_white'
+        idx = self._plot_index(self.data['total_orders'], self.data['completed_orders'])
+        traces = [
+            self._scatter(
+                y=self.data['total_orders'],
+                idx=idx,
+                mode='lines+markers',
+                name='总订单',
+                line=dict(color='blue', width=2)
+            ),
+            self._scatter(
+                y=self.data['completed_orders'],
+                idx=idx,
+                mode='lines+markers',
+                name='完成订单',
+                line=dict(color='green', width=2)
+            ),
+        ]
+
+        fig = go.Figure(
+            data=traces,
+            layout=go.Layout(
+                title='订单趋势',
+                xaxis_title='天数',
+                yaxis_title='订单数',
+                hovermode='x unified',
+                template='plotly_white'
+            )
         )
 
         if save_path:
@@ -51,39 +111,36 @@ class Visualizer:
         return fig
 
     def plot_supply_demand(self, save_path: str = None):
-        """供需平衡图"""
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-
-        fig.add_trace(
-            go.Scatter(
-                x=self.df['day'],
-                y=self.df['total_orders'],
+        """供需平衡图（共用 x 轴，供给曲线使用右侧 y 轴）"""
+        idx = self._plot_index(self.data['total_orders'], self.data['available_escorts'])
+        traces = [
+            self._scatter(
+                y=self.data['total_orders'],
+                idx=idx,
                 mode='lines',
                 name='需求（订单数）',
                 line=dict(color='orange', width=2)
             ),
-            secondary_y=False,
-        )
-
-        fig.add_trace(
-            go.Scatter(
-                x=self.df['day'],
-                y=self.df['available_escorts'],
+            self._scatter(
+                y=self.data['available_escorts'],
+                idx=idx,
                 mode='lines',
                 name='供给（可用陪诊员）',
-                line=dict(color='purple', width=2)
+                line=dict(color='purple', width=2),
+                yaxis='y2',
             ),
-            secondary_y=True,
-        )
-
-        fig.update_xaxes(title_text="天数")
-        fig.update_yaxes(title_text="订单数", secondary_y=False)
-        fig.update_yaxes(title_text="陪诊员数", secondary_y=True)
-
-        fig.update_layout(
-            title='供需平衡',
-            hovermode='x unified',
-            template='plotly_white'
+        ]
+
+        fig = go.Figure(
+            data=traces,
+            layout=go.Layout(
+                title='供需平衡',
+                hovermode='x unified',
+                template='plotly_white',
+                xaxis=dict(title='天数'),
+                yaxis=dict(title='订单数'),
+                yaxis2=dict(title='陪诊员数', overlaying='y', side='right'),
+            )
         )
 
         if save_path:
@@ -98,40 +155,38 @@ class Visualizer:
             subplot_titles=('GMV 趋势', '毛利率趋势'),
             vertical_spacing=0.15
         )
-
-        # GMV
-        fig.add_trace(
-            go.Scatter(
-                x=self.df['day'],
-                y=self.df['gmv'],
-                mode='lines',
-                name='GMV',
-                line=dict(color='green', width=2),
-                fill='tozeroy'
-            ),
-            row=1, col=1
-        )
-
-        # 毛利率
-        fig.add_trace(
-            go.Scatter(
-                x=self.df['day'],
-                y=self.df['margin_rate'] * 100,
-                mode='lines',
-                name='毛利率 (%)',
-                line=dict(color='blue', width=2)
-            ),
-            row=2, col=1
+        idx = self._plot_index(self.data['gmv'], self._margin_pct)
+
+        fig.add_traces(
+            [
+                # GMV
+                self._scatter(
+                    y=self.data['gmv'],
+                    idx=idx,
+                    mode='lines',
+                    name='GMV',
+                    line=dict(color='green', width=2),
+                    fill='tozeroy'
+                ),
+                # 毛利率
+                self._scatter(
+                    y=self._margin_pct,
+                    idx=idx,
+                    mode='lines',
+                    name='毛利率 (%)',
+                    line=dict(color='blue', width=2)
+                ),
+            ],
+            rows=[1, 2], cols=[1, 1],
         )
 
-        fig.update_xaxes(title_text="天数", row=2, col=1)
-        fig.update_yaxes(title_text="GMV (元)", row=1, col=1)
-        fig.update_yaxes(title_text="毛利率 (%)", row=2, col=1)
-
         fig.update_layout(
             height=600,
             showlegend=True,
-            template='plotly_white'
+            template='plotly_white',
+            xaxis2_title='天数',
+            yaxis_title='GMV (元)',
+            yaxis2_title='毛利率 (%)',
         )
 
         if save_path:
@@ -141,15 +196,24 @@ class Visualizer:
 
     def plot_completion_rate(self, save_path: str = None):
         """完成率趋势"""
-        fig = go.Figure()
-
-        fig.add_trace(go.Scatter(
-            x=self.df['day'],
-            y=self.df['completion_rate'] * 100,
-            mode='lines+markers',
-            name='完成率',
-            line=dict(color='teal', width=2)
-        ))
+        fig = go.Figure(
+            data=[
+                self._scatter(
+                    y=self._completion_pct,
+                    idx=self._plot_index(self._completion_pct),
+                    mode='lines+markers',
+                    name='完成率',
+                    line=dict(color='teal', width=2)
+                ),
+            ],
+            layout=go.Layout(
+                title='订单完成率趋势',
+                xaxis_title='天数',
+                yaxis_title='完成率 (%)',
+                hovermode='x unified',
+                template='plotly_white'
+            )
+        )
 
         fig.add_hline(
             y=self.result.avg_completion_rate * 100,
@@ -158,29 +222,40 @@ class Visualizer:
             annotation_text=f"平均: {self.result.avg_completion_rate:.1%}"
         )
 
-        fig.update_layout(
-            title='订单完成率趋势',
-            xaxis_title='天数',
-            yaxis_title='完成率 (%)',
-            hovermode='x unified',
-            template='plotly_white'
-        )
-
         if save_path:
             fig.write_html(save_path)
 
         return fig
 
-    def generate_all_charts(self, output_dir: str = "output"):
-        """生成所有图表"""
+    def generate_all_charts(self, output_dir: str = "output", include_plotlyjs="cdn"):
+        """生成所有图表
+
+        include_plotlyjs 默认 'cdn'，HTML 从 CDN 加载 plotly.js（离线查看可传 True 内嵌）
+        """
         import os
         os.makedirs(output_dir, exist_ok=True)
 
         charts = {
-            "order_trend": self.plot_order_trend(f"{output_dir}/order_trend.html"),
-            "supply_demand": self.plot_supply_demand(f"{output_dir}/supply_demand.html"),
-            "financial": self.plot_financial_metrics(f"{output_dir}/financial.html"),
-            "completion": self.plot_completion_rate(f"{output_dir}/completion_rate.html"),
+            "order_trend": self.plot_order_trend(),
+            "supply_demand": self.plot_supply_demand(),
+            "financial": self.plot_financial_metrics(),
+            "completion": self.plot_completion_rate(),
         }
+        file_names = {
+            "order_trend": "order_trend.html",
+            "supply_demand": "supply_demand.html",
+            "financial": "financial.html",
+            "completion": "completion_rate.html",
+        }
+
+        # 各图表相互独立，并行序列化写盘
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(
+                lambda name: charts[name].write_html(
+                    os.path.join(output_dir, file_names[name]),
+                    include_plotlyjs=include_plotlyjs,
+                ),
+                charts,
+            ))
 
         return charts
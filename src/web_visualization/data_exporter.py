@@ -2,19 +2,40 @@
 Data Exporter for Web Visualization
 Extracts data from the simulation and exports it to JSON for the frontend.
 """
-import json
 import os
 import random
 import shutil
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from datetime import datetime, timedelta
+import numpy as np
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    import json
+    HAS_ORJSON = False
 
 from ..config.integrated_data_config import integrated_config
 from .simulation_runner import VisualizableSimulation
 from ..config.settings import SimulationConfig
 
 
+def _dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes (orjson when installed, stdlib json otherwise)"""
+    if HAS_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
 class DataExporter:
     """
     Exports simulation data to JSON files.
@@ -34,6 +55,12 @@ class DataExporter:
         self.districts = []
         self.user_community_map = {} # user_id -> community_id
 
+        # Lookup indexes, rebuilt by _generate_static_data
+        self._hospital_by_name: Dict[str, Dict] = {}
+        # Shared (lat, lon) tuples reused by every event at the same place
+        self._hospital_loc: Dict[str, Tuple[float, float]] = {}
+        self._community_loc: Dict[str, Tuple[float, float]] = {}
+
     def _init_directories(self):
         """Initialize output directories"""
         if self.output_dir.exists():
@@ -125,7 +152,10 @@ class DataExporter:
         
         hospital_names = sim.config.covered_hospitals
         self.hospitals = []
-        
+
+        # Jitter for fallback hospitals, drawn for all hospitals at once
+        hospital_jitter = np.random.uniform(-0.02, 0.02, (len(hospital_names), 2))
+
         for i, name in enumerate(hospital_names):
             if name in real_hospitals:
                 info = real_hospitals[name]
@@ -144,8 +174,8 @@ class DataExporter:
                 self.hospitals.append({
                     "id": f"hospital_{i+1}",
                     "name": name,
-                    "lat": round(district["center"][0] + random.uniform(-0.02, 0.02), 6),
-                    "lon": round(district["center"][1] + random.uniform(-0.02, 0.02), 6),
+                    "lat": round(district["center"][0] + float(hospital_jitter[i, 0]), 6),
+                    "lon": round(district["center"][1] + float(hospital_jitter[i, 1]), 6),
                     "district": district["name"],
                     "level": "三甲",
                     "capacity": 100
@@ -159,47 +189,52 @@ class DataExporter:
         for district in self.districts:
             # Generate 5-10 communities per district
             num_communities = random.randint(5, 10)
-            for _ in range(num_communities):
-                lat = district["center"][0] + random.uniform(-0.04, 0.04)
-                lon = district["center"][1] + random.uniform(-0.04, 0.04)
-                
+            # Coordinates and populations drawn per district as vectors
+            lats = np.round(district["center"][0] + np.random.uniform(-0.04, 0.04, num_communities), 6)
+            lons = np.round(district["center"][1] + np.random.uniform(-0.04, 0.04, num_communities), 6)
+            populations = np.random.randint(3000, 10001, num_communities)
+
+            for lat, lon, population in zip(lats.tolist(), lons.tolist(), populations.tolist()):
                 self.communities.append({
                     "id": f"community_{community_id_counter}",
                     "name": f"{district['name']}小区{community_id_counter}",
-                    "lat": round(lat, 6),
-                    "lon": round(lon, 6),
+                    "lat": lat,
+                    "lon": lon,
                     "district": district["name"],
-                    "population": random.randint(3000, 10000)
+                    "population": population
                 })
                 community_id_counter += 1
 
+        # --- Lookup indexes ---
+        self._hospital_by_name = {h["name"]: h for h in self.hospitals}
+        self._hospital_loc = {h["id"]: (h["lat"], h["lon"]) for h in self.hospitals}
+        self._community_loc = {c["id"]: (c["lat"], c["lon"]) for c in self.communities}
+
     def _export_static_data(self):
         """Export static data to JSON"""
         
         # Districts
-        with open(self.static_dir / "districts.json", "w", encoding="utf-8") as f:
-            json.dump({"version": "1.0", "districts": self.districts}, f, ensure_ascii=False, indent=2)
+        (self.static_dir / "districts.json").write_bytes(_dumps({"version": "1.0", "districts": self.districts}, indent=True))
 
         # Hospitals
-        with open(self.static_dir / "hospitals.json", "w", encoding="utf-8") as f:
-            json.dump({"version": "1.0", "hospitals": self.hospitals}, f, ensure_ascii=False, indent=2)
+        (self.static_dir / "hospitals.json").write_bytes(_dumps({"version": "1.0", "hospitals": self.hospitals}, indent=True))
 
         # Communities
-        with open(self.static_dir / "communities.json", "w", encoding="utf-8") as f:
-            json.dump({"version": "1.0", "communities": self.communities}, f, ensure_ascii=False, indent=2)
+        (self.static_dir / "communities.json").write_bytes(_dumps({"version": "1.0", "communities": self.communities}, indent=True))
 
-    def _assign_user_community(self, user_id: str) -> str:
-        """Assign a community to a user consistently"""
-        if user_id not in self.user_community_map:
-            community = random.choice(self.communities)
-            self.user_community_map[user_id] = community["id"]
-        return self.user_community_map[user_id]
+    def _assign_user_communities(self, orders: List[Any]):
+        """Assign a community to every not-yet-seen user in orders (consistent per user)"""
+        ucm = self.user_community_map
+        # dict.fromkeys dedupes repeat users within the day while keeping order
+        missing = list(dict.fromkeys(o.user.id for o in orders if o.user.id not in ucm))
+        picks = random.choices(self.communities, k=len(missing))
+        ucm.update(zip(missing, (c["id"] for c in picks)))
 
     def _get_hospital_by_name(self, name: str) -> Dict:
         """Find hospital by name"""
-        for h in self.hospitals:
-            if h["name"] == name:
-                return h
+        hospital = self._hospital_by_name.get(name)
+        if hospital is not None:
+            return hospital
         # Fallback if not found (should match config)
         if self.hospitals:
             return self.hospitals[0]
@@ -210,195 +245,246 @@ class DataExporter:
         
         start_date = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
         
-        # Real implementation of export loop with history tracking
-        processed_matched_ids = set()
-        processed_completed_ids = set()
+        # Lookups used per event, bound to locals once
+        ucm = self.user_community_map
+        get_hospital = self._get_hospital_by_name
+        hospital_loc_map = self._hospital_loc
+        community_loc_map = self._community_loc
         
-        for day in sorted(daily_events.keys()):
-            events_data = daily_events[day]
-            export_events = []
+        # Day files are handed to one writer thread. Serialization holds the GIL,
+        # so more workers would not add overlap; the with block also shuts the
+        # pool down if building a day raises.
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="export") as executor:
+            writes = []
+            for day in sorted(daily_events.keys()):
+                events_data = daily_events[day]
             
-            # 1. New Orders
-            new_orders = events_data.get("new_orders", [])
+                # 1. New Orders
+                new_orders = events_data.get("new_orders", [])
             
-            # Map order_id to its created timestamp to ensure consistency
-            order_created_times = {}
+                # Map order_id to its created time (seconds since midnight) to ensure consistency
+                order_created_times = {}
+
+                # Create a base datetime for this day
+                # Note: simulation start_date might differ, but we construct a date here
+                today_base = start_date + timedelta(days=day)
 
-            for order in new_orders:
-                # Assign community to user
-                community_id = self._assign_user_community(order.user.id)
-                community = next((c for c in self.communities if c["id"] == community_id), self.communities[0])
-                
-                hospital_data = self._get_hospital_by_name(order.user.target_hospital)
-                
                 # --- FIX: Generate random timestamp between 08:00 and 17:00 ---
                 # Default created_at is likely process time. We want simulation time.
-                # Random hour between 8 and 16 (4 PM) to allow time for service
-                hour = random.randint(8, 16)
-                minute = random.randint(0, 59)
-                second = random.randint(0, 59)
+                # Random hour between 8 and 16 (4 PM) to allow time for service.
+                # Drawn for the whole day at once instead of three randint calls per order.
+                n_new = len(new_orders)
+                hours = np.random.randint(8, 17, n_new).tolist()
+                minutes = np.random.randint(0, 60, n_new).tolist()
+                seconds = np.random.randint(0, 60, n_new).tolist()
+
+                # Assign communities to today's new users in one batch
+                self._assign_user_communities(new_orders)
+
+                # Each kind of event goes into its own list; they are concatenated once below
+                create_events = []
+                append = create_events.append
+
+                for order, hour, minute, second in zip(new_orders, hours, minutes, seconds):
+                    oid = order.id
+                    u = order.user
+                    uid = u.id
+                    # Ids in ucm are always drawn from self.communities, so no fallback is needed
+                    community_id = ucm[uid]
+                    community_loc = community_loc_map[community_id]
+
+                    hospital_data = get_hospital(u.target_hospital)
+                    hospital_loc = hospital_loc_map.get(hospital_data["id"]) or (
+                        hospital_data["lat"], hospital_data["lon"]
+                    )
                 
-                # Create a base datetime for this order on this day
-                # We use the 'day' loop variable to determine the date
-                # Note: simulation start_date might differ, but we construct a date here
-                today_base = start_date + timedelta(days=day)
-                order_time = today_base.replace(hour=hour, minute=minute, second=second)
+                    order_created_times[oid] = hour * 3600 + minute * 60 + second
+
+                    ts = f"{hour:02d}:{minute:02d}:{second:02d}"
                 
-                order_created_times[order.id] = order_time
+                    append({
+                        "event_id": f"evt_create_{oid[:8]}",
+                        "timestamp": ts,
+                        "type": "order_created",
+                        "order_id": oid,
+                        "user": {
+                            "user_id": uid,
+                            "location": community_loc,
+                            "community_id": community_id
+                        },
+                        "hospital": {
+                            "hospital_id": hospital_data["id"],
+                            "location": hospital_loc
+                        },
+                        "metadata": {
+                            "is_first_order": not u.is_repurchase,
+                            "disease_type": u.disease_type
+                        }
+                    })
+
+                # 2. Orders matched today (already diffed against earlier days by the runner)
+                newly_matched = events_data.get("newly_matched", [])
+                completed_snapshot = events_data.get("completed_orders", [])
+
+                # Match delay (5-30 mins) and fallback creation time, drawn per day in bulk
+                n_matched = len(newly_matched)
+                delays = np.random.randint(5, 31, n_matched).tolist()
+                fallback_hours = np.random.randint(8, 17, n_matched).tolist()
+                fallback_minutes = np.random.randint(0, 60, n_matched).tolist()
+
+                match_events = []
+                append = match_events.append
+                for order, delay_mins, fallback_hour, fallback_minute in zip(
+                    newly_matched, delays, fallback_hours, fallback_minutes
+                ):
+                    oid = order.id
+                    short = oid[:8]
+                    escort = order.escort
                 
-                ts = order_time.strftime("%H:%M:%S")
+                    escort_loc = [escort.location_lat, escort.location_lon] if escort else [39.9, 116.4]
                 
-                export_events.append({
-                    "event_id": f"evt_create_{order.id[:8]}",
-                    "timestamp": ts,
-                    "type": "order_created",
-                    "order_id": order.id,
-                    "user": {
-                        "user_id": order.user.id,
-                        "location": [community["lat"], community["lon"]],
-                        "community_id": community_id
-                    },
-                    "hospital": {
-                        "hospital_id": hospital_data["id"],
-                        "location": [hospital_data["lat"], hospital_data["lon"]]
-                    },
-                    "metadata": {
-                        "is_first_order": not order.user.is_repurchase,
-                        "disease_type": order.user.disease_type
-                    }
-                })
-
-            # 2. Scan all relevant lists for status updates
-            serving_snapshot = events_data.get("serving_orders_snapshot", [])
-            completed_snapshot = events_data.get("completed_orders", [])
-            
-            all_touched_orders = serving_snapshot + completed_snapshot
-            
-            for order in all_touched_orders:
-                if order.id not in processed_matched_ids:
-                    # It's a new match event
-                    processed_matched_ids.add(order.id)
-                    
-                    escort_loc = [order.escort.location_lat, order.escort.location_lon] if order.escort else [39.9, 116.4]
-                    
                     # Estimate match time: 5-30 mins after creation, or random if creation time unknown
-                    if order.id in order_created_times:
-                        creation_time = order_created_times[order.id]
-                    else:
+                    creation_time = order_created_times.get(oid)
+                    if creation_time is None:
                         # Fallback: created earlier today?
-                        hour = random.randint(8, 16)
-                        creation_time = (start_date + timedelta(days=day)).replace(hour=hour, minute=random.randint(0,59))
-
-                    # Match delay: 5 to 30 mins
-                    delay_mins = random.randint(5, 30)
-                    match_time = creation_time + timedelta(minutes=delay_mins)
-                    
-                    ts = match_time.strftime("%H:%M:%S")
-                    
-                    export_events.append({
-                        "event_id": f"evt_match_{order.id[:8]}",
+                        creation_time = fallback_hour * 3600 + fallback_minute * 60
+
+                    # Match time = creation + delay (latest 16:59:59 + 30 min, never past midnight)
+                    match_minutes, match_second = divmod(creation_time + delay_mins * 60, 60)
+                    match_hour, match_minute = divmod(match_minutes, 60)
+                    ts = f"{match_hour:02d}:{match_minute:02d}:{match_second:02d}"
+                
+                    append({
+                        "event_id": f"evt_match_{short}",
                         "timestamp": ts,
                         "type": "order_matched",
-                        "order_id": order.id,
+                        "order_id": oid,
                         "escort": {
-                            "escort_id": order.escort.id,
+                            "escort_id": escort.id,
                             "location": escort_loc
                         }
                     })
-                    
+                
                     # Generate Service Start Event (Same time usually)
-                    export_events.append({
-                        "event_id": f"evt_start_{order.id[:8]}",
+                    append({
+                        "event_id": f"evt_start_{short}",
                         "timestamp": ts,
                         "type": "service_start",
-                        "order_id": order.id
+                        "order_id": oid
                     })
 
-            # Find all orders that are new to "completed" state
-            for order in completed_snapshot:
-                if order.id not in processed_completed_ids:
-                    processed_completed_ids.add(order.id)
-                    
+                # Completion time and price, drawn per day in bulk
+                n_completed = len(completed_snapshot)
+                end_hours = np.random.randint(10, 19, n_completed).tolist()
+                end_minutes = np.random.randint(0, 60, n_completed).tolist()
+                prices = np.random.randint(200, 271, n_completed).tolist()  # Avg ~235
+
+                # Orders completed today (a per-day list, so no dedup needed)
+                complete_events = []
+                append = complete_events.append
+                for order, end_hour, end_min, price in zip(
+                    completed_snapshot, end_hours, end_minutes, prices
+                ):
+                    oid = order.id
+                
                     # Estimate completion time: 2-4 hours after match
                     # We need match time. 
                     # If we just processed match, use it. If not, guess.
-                    
+                
                     # For consistency, we need to store match times? 
                     # Simpler: Random time between 10:00 and 19:00, ensuring it's later?
                     # Or just random 2-4h duration.
-                    
+                
                     # Re-calculate or retrieve match time?
                     # Since we don't have persistent state of match times easily here, 
                     # we'll approximate: hour = random(10, 18)
-                    
-                    end_hour = random.randint(10, 18)
-                    end_min = random.randint(0, 59)
-                    
-                    complete_time = (start_date + timedelta(days=day)).replace(hour=end_hour, minute=end_min)
-                    ts = complete_time.strftime("%H:%M:%S")
-                    
-                    export_events.append({
-                        "event_id": f"evt_complete_{order.id[:8]}",
+
+                    ts = f"{end_hour:02d}:{end_min:02d}:00"
+                
+                    append({
+                        "event_id": f"evt_complete_{oid[:8]}",
                         "timestamp": ts,
                         "type": "order_completed",
-                        "order_id": order.id,
+                        "order_id": oid,
                         "rating": order.rating,
                         "is_success": order.is_success,
-                        "price": random.randint(200, 270) # Avg ~235
+                        "price": price
                     })
 
-            # Inject Feedback Cases from Report
-            self._inject_highlight_cases(export_events, day)
+                export_events = create_events + match_events + complete_events
 
-            # Sort events by timestamp
-            export_events.sort(key=lambda x: x["timestamp"])
-            
-            # Generate Summary
-            completed_events = [e for e in export_events if e["type"] == "order_completed"]
-            completed_count = len(completed_events)
-            
-            # GMV & Price
-            total_gmv = sum(e.get("price", 0) for e in completed_events)
-            avg_price = round(total_gmv / completed_count, 1) if completed_count > 0 else 0
-            
-            # Avg Rating
-            ratings = [e["rating"] for e in completed_events if "rating" in e]
-            avg_rating = round(sum(ratings) / len(ratings), 1) if ratings else 0.0
-            
-            # Hourly Stats
-            hourly_stats = {}
-            for e in export_events:
-                h = e["timestamp"].split(":")[0]
-                if h not in hourly_stats: hourly_stats[h] = 0
-                hourly_stats[h] += 1
-
-            summary = {
-                "total_orders": len(new_orders), # New orders today
-                "completed_orders": completed_count,
-                "gmv": total_gmv,
-                "avg_price": avg_price,
-                "avg_rating": avg_rating,
-                "hourly_stats": hourly_stats
-            }
-            
-            # Export Day Data
-            day_file = self.dynamic_dir / f"day_{day+1}_events.json"
-            summary_file = self.dynamic_dir / f"day_{day+1}_summary.json"
+                # Inject Feedback Cases from Report
+                self._inject_highlight_cases(export_events, day)
+
+                # Sort events by timestamp (fixed-width HH:MM:SS, so lexical order is time order)
+                export_events.sort(key=itemgetter("timestamp"))
             
-            with open(day_file, "w", encoding="utf-8") as f:
-                json.dump({
-                    "version": "1.0",
-                    "day": day + 1,
-                    "date": (start_date + timedelta(days=day)).strftime("%Y-%m-%d"),
-                    "events": export_events
-                }, f, ensure_ascii=False, indent=2)
-                
-            with open(summary_file, "w", encoding="utf-8") as f:
-                json.dump({
-                    "version": "1.0",
-                    "day": day + 1,
-                    "summary": summary
-                }, f, ensure_ascii=False, indent=2)
+                # Nothing happened today (no new, matched or completed orders): skip both files
+                if not export_events:
+                    continue
+
+                # Serialize and write on the writer thread while the next day is assembled
+                writes.append(executor.submit(
+                    self._write_day_files, day, today_base.strftime("%Y-%m-%d"),
+                    export_events, len(new_orders),
+                ))
+
+            # Wait for all day files and surface any write error
+            for future in writes:
+                future.result()
+
+    def _write_day_files(self, day: int, date: str, export_events: List[Dict], total_orders: int):
+        """Write day_N_events.json and day_N_summary.json for one day"""
+        # Export Day Data (compact JSON; only the small static files are indented)
+        day_file = self.dynamic_dir / f"day_{day+1}_events.json"
+        summary_file = self.dynamic_dir / f"day_{day+1}_summary.json"
+
+        # Summary counts in their own pass over the day's events
+        completed_count = 0
+        total_gmv = 0
+        rating_sum = 0.0
+        rating_n = 0
+        hourly_stats = {}
+        for e in export_events:
+            h = e["timestamp"][:2]
+            hourly_stats[h] = hourly_stats.get(h, 0) + 1
+            if e["type"] == "order_completed":
+                completed_count += 1
+                total_gmv += e.get("price", 0)
+                r = e.get("rating")
+                if r is not None:
+                    rating_sum += r
+                    rating_n += 1
+
+        # One dumps + write_bytes for the whole document: the events are already built
+        # and sorted in memory, so writing them one at a time saves no memory and is slower
+        day_file.write_bytes(_dumps({
+            "version": "1.0",
+            "day": day + 1,
+            "date": date,
+            "events": export_events
+        }))
+
+        # GMV & Price
+        avg_price = round(total_gmv / completed_count, 1) if completed_count > 0 else 0
+
+        # Avg Rating
+        avg_rating = round(rating_sum / rating_n, 1) if rating_n else 0.0
+
+        summary = {
+            "total_orders": total_orders, # New orders today
+            "completed_orders": completed_count,
+            "gmv": total_gmv,
+            "avg_price": avg_price,
+            "avg_rating": avg_rating,
+            "hourly_stats": hourly_stats
+        }
+
+        summary_file.write_bytes(_dumps({
+            "version": "1.0",
+            "day": day + 1,
+            "summary": summary
+        }))
 
     def _inject_highlight_cases(self, export_events: List[Dict], day: int):
         """Inject specific feedback cases from the report into the event stream"""